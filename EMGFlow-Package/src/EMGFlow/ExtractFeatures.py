@@ -1,13 +1,17 @@
 import scipy
 import pandas as pd
 import numpy as np
+import math
 import os
 import re
+import csv
 from tqdm import tqdm
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 
 from .FileAccess import *
-from .PreprocessSignals import EMG2PSD
+from .PreprocessSignals import EMG2PSD, _EMG2PSDArrays
 
 #
 # =============================================================================
@@ -17,10 +21,124 @@ from .PreprocessSignals import EMG2PSD
 A collection of functions for extracting features.
 """
 
+# Columns of a PSD DataFrame
+_PSD_COLS = frozenset(('Frequency', 'Power'))
+
+#
+# =============================================================================
+#
+
+
+def _GetColumn(Signal, col):
+    """
+    Get a column of a Signal as an ndarray, checking that it exists.
+
+    Parameters
+    ----------
+    Signal : DataFrame
+        A Pandas DataFrame containing a 'Time' column, and additional columns
+        for signal data.
+    col : str
+        Column of the Signal to get.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if col is not found in Signal.
+
+    Returns
+    -------
+    vals : ndarray
+        Values of the column.
+
+    """
+    
+    if col not in Signal.columns:
+        raise Exception("Column " + col + " not in Signal")
+    
+    return Signal[col].to_numpy()
+
+#
+# =============================================================================
+#
+
+def _GetPSD(psd):
+    """
+    Get the columns of a PSD as ndarrays, checking that it is a valid PSD.
+
+    Parameters
+    ----------
+    psd : DataFrame, tuple
+        A Pandas DataFrame containing a 'Frequency' and 'Power' column, or a
+        (frequency, power) tuple of arrays, as used internally to avoid
+        building a DataFrame.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if psd does not only have columns 'Frequency'
+        and 'Power'.
+
+    Returns
+    -------
+    frequency : ndarray
+        Values of the 'Frequency' column.
+    power : ndarray
+        Values of the 'Power' column.
+
+    """
+    
+    if isinstance(psd, tuple):
+        return psd
+    
+    if len(psd.columns) != 2 or frozenset(psd.columns) != _PSD_COLS:
+        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    
+    return psd['Frequency'].to_numpy(), psd['Power'].to_numpy()
+
 #
 # =============================================================================
 #
 
+def _SplitPSD(psd, freq):
+    """
+    Split a PSD into the frequencies above and below a threshold. Frequencies
+    equal to the threshold belong to neither part.
+
+    Parameters
+    ----------
+    psd : DataFrame
+        A Pandas DataFrame containing a 'Frequency' and 'Power' column.
+    freq : float
+        Frequency threshold to split the PSD at.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if psd does not only have columns 'Frequency'
+        and 'Power'.
+
+    Returns
+    -------
+    fast_frequency : ndarray
+        Frequencies above freq.
+    fast_power : ndarray
+        Power of the frequencies above freq.
+    slow_frequency : ndarray
+        Frequencies below freq.
+    slow_power : ndarray
+        Power of the frequencies below freq.
+
+    """
+    
+    frequency, power = _GetPSD(psd)
+    fast = frequency > freq
+    slow = frequency < freq
+    return frequency[fast], power[fast], frequency[slow], power[slow]
+
+#
+# =============================================================================
+#
 
 def CalcIEMG(Signal, col, sr):
     """
@@ -50,13 +168,12 @@ def CalcIEMG(Signal, col, sr):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
     if sr <= 0:
         raise Exception("Sampling rate cannot be 0 or negative")
     
-    IEMG = np.sum(np.abs(Signal[col]) * sr)
+    IEMG = np.abs(vals).sum() * sr
     return IEMG
 
 #
@@ -88,11 +205,9 @@ def CalcMAV(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    MAV = np.sum(np.abs(Signal[col])) / N
+    MAV = np.abs(vals).sum() / len(vals)
     return MAV
 
 #
@@ -123,18 +238,15 @@ def CalcMMAV(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    vals = list(np.abs(Signal[col]))
-    total = 0
-    for n in range(N):
-        if (0.25*N <= n) and (n <= 0.75*N):
-            total += vals[n]
-        else:
-            total += 0.5 * vals[n]
-    MMAV = total/N
+    vals = np.abs(vals)
+    N = len(vals)
+    # Weight the middle half of the Signal by 1, and the rest by 0.5, by
+    # adding half the middle back onto half the total
+    low = int(np.ceil(0.25*N))
+    high = int(np.floor(0.75*N))
+    MMAV = 0.5 * (np.sum(vals) + np.sum(vals[low:high + 1]))/N
     return MMAV
 
 #
@@ -169,13 +281,12 @@ def CalcSSI(Signal, col, sr):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
     if sr <= 0:
         raise Exception("Sampling rate cannot be 0 or negative")
     
-    SSI = np.sum((np.abs(Signal[col]) * sr) ** 2)
+    SSI = (sr ** 2) * np.dot(vals, vals)
     return SSI
 
 #
@@ -206,11 +317,9 @@ def CalcVAR(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    VAR = 1/(N - 1) * np.sum(Signal[col] ** 2)
+    VAR = np.dot(vals, vals) / (len(vals) - 1)
     return VAR
 
 #
@@ -241,10 +350,9 @@ def CalcVOrder(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    vOrder = np.sqrt(CalcVAR(Signal, col))
+    vOrder = np.sqrt(np.dot(vals, vals) / (len(vals) - 1))
     return vOrder
 
 #
@@ -275,11 +383,9 @@ def CalcRMS(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal)
-    RMS = np.sqrt((1/N) * np.sum(Signal[col] ** 2))
+    RMS = np.sqrt(np.dot(vals, vals) / len(vals))
     return RMS
 
 #
@@ -310,13 +416,10 @@ def CalcWL(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    vals = list(Signal[col])
-    diff = np.array([np.abs(vals[i + 1] - vals[i]) for i in range(N - 1)])
-    WL = np.sum(diff)
+    diff = np.diff(vals)
+    WL = np.sum(np.abs(diff, out=diff))
     return WL
 
 #
@@ -349,13 +452,10 @@ def CalcWAMP(Signal, col, threshold):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    vals = list(Signal[col])
-    diff = np.array([np.abs(vals[i + 1] - vals[i]) for i in range(N - 1)])
-    WAMP = np.sum(diff > threshold)
+    diff = np.diff(vals)
+    WAMP = np.count_nonzero(np.abs(diff, out=diff) > threshold)
     return WAMP
 
 #
@@ -386,12 +486,9 @@ def CalcLOG(Signal, col):
     
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    N = len(Signal[col])
-    ex = (1/N) * np.sum(np.log(Signal[col]))
-    LOG = np.e ** ex
+    LOG = math.exp(np.mean(np.log(np.abs(vals))))
     return LOG
 
 #
@@ -422,13 +519,11 @@ def CalcMFL(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    vals = Signal[col]
-    N = len(Signal[col])
-    diff = np.array([np.abs(vals[i + 1] - vals[i]) for i in range(N - 1)])
-    MFL = np.log(np.sqrt(np.sum(diff ** 2)))
+    diff = np.diff(vals)
+    # log(sqrt(x)) = 0.5*log(x)
+    MFL = 0.5 * np.log(np.dot(diff, diff))
     return MFL
 
 #
@@ -459,16 +554,263 @@ def CalcAP(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    vals = _GetColumn(Signal, col)
     
-    AP = np.sum(Signal[col] ** 2) / len(Signal[col])
+    AP = np.dot(vals, vals) / len(vals)
     return AP
 
 #
 # =============================================================================
 #
 
+def _SumProducts(a, b):
+    """
+    Sum the products of two arrays along their last axis, without building
+    the array of products.
+
+    Parameters
+    ----------
+    a : ndarray
+        First array.
+    b : ndarray
+        Second array, of the same shape as a.
+
+    Returns
+    -------
+    float
+        Sum of the products, with one value per row if a and b are 2D.
+
+    """
+    
+    # A 1D dot product is a single BLAS call, while rows of a 2D array are
+    # summed together by einsum
+    if a.ndim == 1:
+        return np.dot(a, b)
+    return np.einsum('...i,...i->...', a, b)
+
+#
+# =============================================================================
+#
+
+def _TimeFeatures(vals, sr, threshold=None):
+    """
+    Calculate the time-series features of one or more Signals, along the last
+    axis of vals.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal, or a 2D array with one Signal window per row.
+    sr : float
+        Sampling rate of the Signal.
+    threshold : float, optional
+        Threshold of the WAMP. The default is None, in which case the WAMP is
+        not calculated.
+
+    Returns
+    -------
+    features : dict
+        Dictionary of feature names and their values, with one value per row
+        of vals if vals is 2D.
+
+    """
+    
+    N = vals.shape[-1]
+    
+    # Shared sums of the Signal
+    abs_vals = np.abs(vals, dtype=np.float64)
+    sum_abs = np.sum(abs_vals, axis=-1)
+    sum_sq = _SumProducts(vals, vals)
+    
+    # Shared sums of the differences
+    diff = np.diff(vals, axis=-1)
+    sum_diff_sq = _SumProducts(diff, diff)
+    abs_diff = np.abs(diff, out=diff)
+    
+    # Middle half of the Signal for the MMAV
+    low = int(np.ceil(0.25*N))
+    high = int(np.floor(0.75*N))
+    sum_abs_mid = np.sum(abs_vals[..., low:high + 1], axis=-1)
+    
+    # Take the logs in place, as the absolute values are no longer needed
+    log_abs = np.log(abs_vals, out=abs_vals)
+    
+    features = {
+        'IEMG': sum_abs * sr,
+        'MAV': sum_abs / N,
+        'MMAV': 0.5 * (sum_abs + sum_abs_mid)/N,
+        'SSI': (sr ** 2) * sum_sq,
+        'VAR': sum_sq / (N - 1),
+        'VOrder': np.sqrt(sum_sq / (N - 1)),
+        'RMS': np.sqrt(sum_sq / N),
+        'WL': np.sum(abs_diff, axis=-1),
+        'LOG': np.exp(np.mean(log_abs, axis=-1)),
+        'MFL': 0.5 * np.log(sum_diff_sq),
+        'AP': sum_sq / N
+    }
+    
+    if threshold is not None:
+        features['WAMP'] = np.count_nonzero(abs_diff > threshold, axis=-1)
+    
+    return features
+
+#
+# =============================================================================
+#
+
+def CalcTimeFeatures(Signal, col, sr, threshold=None):
+    """
+    Calculate all time-series features of a Signal at once, sharing the
+    intermediate sums between them instead of reading the column once per
+    feature.
+
+    Parameters
+    ----------
+    Signal : DataFrame
+        A Pandas DataFrame containing a 'Time' column, and additional columns
+        for signal data.
+    col : str
+        Column of the Signal to apply the summaries to.
+    sr : float
+        Sampling rate of the Signal.
+    threshold : float, optional
+        Threshold of the WAMP. The default is None, in which case the WAMP is
+        not calculated.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if col is not found in Signal.
+    Exception
+        An exception is raised if sr is less or equal to 0.
+
+    Returns
+    -------
+    features : dict
+        Dictionary of feature names ('IEMG', 'MAV', 'MMAV', 'SSI', 'VAR',
+        'VOrder', 'RMS', 'WL', 'LOG', 'MFL', 'AP', and 'WAMP' if threshold is
+        provided) and their values.
+
+    """
+    
+    vals = _GetColumn(Signal, col)
+    
+    if sr <= 0:
+        raise Exception("Sampling rate cannot be 0 or negative")
+    
+    return _TimeFeatures(vals, sr, threshold)
+
+#
+# =============================================================================
+#
+
+def CalcWindowFeatures(Signal, col, sr, window_size, step=None, threshold=None):
+    """
+    Calculate the time-series features of each window of a Signal. All
+    windows are calculated together as rows of a single array, without
+    copying the Signal or looping over the windows.
+
+    Parameters
+    ----------
+    Signal : DataFrame
+        A Pandas DataFrame containing a 'Time' column, and additional columns
+        for signal data.
+    col : str
+        Column of the Signal to apply the summaries to.
+    sr : float
+        Sampling rate of the Signal.
+    window_size : int
+        Number of samples in each window.
+    step : int, optional
+        Number of samples between the starts of consecutive windows. The
+        default is None, in which case the windows do not overlap.
+    threshold : float, optional
+        Threshold of the WAMP. The default is None, in which case the WAMP is
+        not calculated.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if col is not found in Signal.
+    Exception
+        An exception is raised if sr is less or equal to 0.
+    Exception
+        An exception is raised if window_size is less than 2 or greater than
+        the length of the Signal.
+    Exception
+        An exception is raised if step is less or equal to 0.
+
+    Returns
+    -------
+    features : DataFrame
+        A DataFrame with one row per window, containing a 'Start' column with
+        the position of the first sample of the window, and one column per
+        feature returned by CalcTimeFeatures.
+
+    """
+    
+    vals = _GetColumn(Signal, col)
+    
+    if sr <= 0:
+        raise Exception("Sampling rate cannot be 0 or negative")
+    
+    if window_size < 2 or window_size > len(vals):
+        raise Exception("window_size must be between 2 and the length of the Signal")
+    
+    if step is None:
+        step = window_size
+    
+    if step <= 0:
+        raise Exception("step must be greater than 0")
+    
+    # View each window as a row, without copying
+    windows = np.lib.stride_tricks.sliding_window_view(vals, window_size)[::step]
+    
+    features = pd.DataFrame(_TimeFeatures(windows, sr, threshold))
+    features.insert(0, 'Start', np.arange(len(windows)) * step)
+    return features
+
+#
+# =============================================================================
+#
+
+def _SplitSpecFlux(vals, diff, sr):
+    """
+    Calculate the spectral flux between the first diff percent of a Signal
+    and the rest of it.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal, or a 2D array with one Signal per column.
+    diff : float
+        Percentage of the Signal to split at, between 0 and 1.
+    sr : float
+        Sampling rate of the Signal.
+
+    Returns
+    -------
+    flux : float
+        Spectral flux of the Signal, with one value per column of vals if
+        vals is 2D.
+
+    """
+    
+    # Find column divider index
+    diff_ind = int(len(vals) * diff)
+    # Take the PSD of each part, sized for the shorter part so that both
+    # share the same frequencies
+    window_len = min(diff_ind, len(vals) - diff_ind)
+    power1 = _EMG2PSDArrays(vals[:diff_ind], sampling_rate=sr, window_len=window_len)[1]
+    power2 = _EMG2PSDArrays(vals[diff_ind:], sampling_rate=sr, window_len=window_len)[1]
+    # Calculate the spectral flux
+    power_diff = power1 - power2
+    return _SumProducts(power_diff.T, power_diff.T)
+
+#
+# =============================================================================
+#
+
 def CalcSpecFlux(Signal1, diff, col, sr, diff_sr=None):
     """
     Calculate the spectral flux of a Signal.
@@ -481,7 +823,8 @@ def CalcSpecFlux(Signal1, diff, col, sr, diff_sr=None):
     diff : float, DataFrame
         The divisor of the calculation. If a percentage is provided, it will
         calculate the spectral flux of the percentage of the Signal with one
-        minus the percentage of the Signal.
+        minus the percentage of the Signal. The PSDs of both parts are then
+        sized for the shorter part, so that they share the same frequencies.
     col : str
         Column of the Signal to apply the summary to. If a second signal is
         provided for diff, a column of the same name should be available for
@@ -513,7 +856,7 @@ def CalcSpecFlux(Signal1, diff, col, sr, diff_sr=None):
 
     """
     
-    if col not in list(Signal1.columns.values):
+    if col not in Signal1.columns:
         raise Exception("Column " + col + " not in Signal1")
         
     if sr <= 0:
@@ -524,17 +867,13 @@ def CalcSpecFlux(Signal1, diff, col, sr, diff_sr=None):
         if diff >= 1 or diff <= 0:
             raise Exception("diff must be a float between 0 and 1")
         
-        # Find column divider index
-        diff_ind = int(len(Signal1[col]) * diff)
-        # Take the PSD of each signal
-        psd1 = EMG2PSD(Signal1[col][:diff_ind], sampling_rate=sr)
-        psd2 = EMG2PSD(Signal1[col][diff_ind:], sampling_rate=sr)
-        # Calculate the spectral flux
-        flux = np.sum((psd1['Power'] - psd2['Power']) ** 2)
+        # Spread the FFTs over every CPU
+        with scipy.fft.set_workers(-1):
+            flux = _SplitSpecFlux(Signal1[col].to_numpy(), diff, sr)
         
     # Find spectral flux of Signal1 by div
     elif isinstance(diff, pd.DataFrame):
-        if col not in list(diff.columns.values):
+        if col not in diff.columns:
             raise Exception("Column " + col + " not in diff")
         
         # If no second sampling rate, assume same sampling rate as first Signal
@@ -576,15 +915,13 @@ def CalcMDF(psd):
     
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    prefix_sum = psd['Power'].cumsum()
-    suffix_sum = psd['Power'][::-1].cumsum()[::-1]
-    diff = np.abs(prefix_sum - suffix_sum)
-
-    min_ind = np.argmin(diff)
-    med_freq = psd.loc[diff.index.values[min_ind]]['Frequency']
+    # The suffix sum at each frequency is the total minus the prefix sum
+    # before it
+    prefix_sum = np.cumsum(power)
+    diff = np.abs(2*prefix_sum - prefix_sum[-1] - power)
+    med_freq = frequency[np.argmin(diff)]
     
     return med_freq
     
@@ -614,10 +951,9 @@ def CalcMNF(psd):
     
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    mean_freq = np.sum(psd['Frequency'] * psd['Power']) / np.sum(psd['Power'])
+    mean_freq = np.sum(frequency * power) / np.sum(power)
     return mean_freq
 
 #
@@ -654,13 +990,9 @@ def CalcTwitchRatio(psd, freq=60):
     if freq <= 0:
         raise Exception("freq cannot be less or equal to 0")
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    _, fast_twitch, _, slow_twitch = _SplitPSD(psd, freq)
     
-    fast_twitch = psd[psd['Frequency'] > freq]
-    slow_twitch = psd[psd['Frequency'] < freq]
-    
-    twitch_ratio = np.sum(fast_twitch['Power']) / np.sum(slow_twitch['Power'])
+    twitch_ratio = np.sum(fast_twitch) / np.sum(slow_twitch)
     
     return twitch_ratio
 
@@ -698,13 +1030,13 @@ def CalcTwitchIndex(psd, freq=60):
     if freq <= 0:
         raise Exception("freq cannot be less or equal to 0")
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    _, fast_twitch, _, slow_twitch = _SplitPSD(psd, freq)
     
-    fast_twitch = psd[psd['Frequency'] > freq]
-    slow_twitch = psd[psd['Frequency'] < freq]
+    # An empty frequency range has no maximum
+    fast_max = np.max(fast_twitch) if len(fast_twitch) > 0 else np.nan
+    slow_max = np.max(slow_twitch) if len(slow_twitch) > 0 else np.nan
     
-    twitch_index = np.max(fast_twitch['Power']) / np.max(slow_twitch['Power'])
+    twitch_index = fast_max / slow_max
     
     return twitch_index
 
@@ -712,6 +1044,35 @@ def CalcTwitchIndex(psd, freq=60):
 # =============================================================================
 #
 
+def _Slope(x, y):
+    """
+    Calculate the slope of the least squares line through a set of points.
+
+    Parameters
+    ----------
+    x : ndarray
+        x values of the points.
+    y : ndarray
+        y values of the points.
+
+    Returns
+    -------
+    slope : float
+        Slope of the line.
+
+    """
+    
+    # Fewer than two points have no unique line
+    if len(x) < 2:
+        A = np.vstack([x, np.ones(len(x))]).T
+        return np.linalg.lstsq(A, y, rcond=None)[0][0]
+    x_centered = x - np.mean(x)
+    return np.dot(x_centered, y - np.mean(y)) / np.dot(x_centered, x_centered)
+
+#
+# =============================================================================
+#
+
 def CalcTwitchSlope(psd, freq=60):
     """
     Calculate the Twitch Slope of a PSD.
@@ -744,25 +1105,10 @@ def CalcTwitchSlope(psd, freq=60):
     if freq <= 0:
         raise Exception("freq cannot be less or equal to 0")
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
-    
-    fast_twitch = psd[psd['Frequency'] > freq]
-    slow_twitch = psd[psd['Frequency'] < freq]
-    
-    x_fast = fast_twitch['Frequency']
-    y_fast = fast_twitch['Power']
-    A_fast = np.vstack([x_fast, np.ones(len(x_fast))]).T
-    
-    x_slow = slow_twitch['Frequency']
-    y_slow = slow_twitch['Power']
-    A_slow = np.vstack([x_slow, np.ones(len(x_slow))]).T
+    fast_frequency, fast_power, slow_frequency, slow_power = _SplitPSD(psd, freq)
     
-    fast_alpha = np.linalg.lstsq(A_fast, y_fast, rcond=None)[0]
-    slow_alpha = np.linalg.lstsq(A_slow, y_slow, rcond=None)[0]
-    
-    fast_slope = fast_alpha[0]
-    slow_slope = slow_alpha[0]
+    fast_slope = _Slope(fast_frequency, fast_power)
+    slow_slope = _Slope(slow_frequency, slow_power)
     
     return fast_slope, slow_slope
 
@@ -792,10 +1138,9 @@ def CalcSC(psd):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    SC = np.sum(psd['Power']*psd['Frequency']) / np.sum(psd['Power'])
+    SC = np.sum(power*frequency) / np.sum(power)
     return SC
 
 #
@@ -824,11 +1169,11 @@ def CalcSF(psd):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    N = psd.shape[0]
-    SF = np.prod(psd['Power'] ** (1/N)) / ((1/N) * np.sum(psd['Power']))
+    # Take the geometric mean as the exponent of the mean log, which does not
+    # underflow for long PSDs
+    SF = np.exp(np.mean(np.log(power))) / np.mean(power)
     return SF
 
 #
@@ -857,18 +1202,17 @@ def CalcSS(psd):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
     SC = CalcSC(psd)
-    SS = np.sum(((psd['Frequency'] - SC) ** 2) * psd['Power']) / np.sum(psd['Power'])
+    SS = np.sum(((frequency - SC) ** 2) * power) / np.sum(power)
     return SS
 
 #
 # =============================================================================
 #
 
-def CalcSDec(psd):
+def CalcSDec(psd, weighted=False):
     """
     Calculate the Spectral Decrease (SDec) of a PSD.
 
@@ -876,6 +1220,10 @@ def CalcSDec(psd):
     ----------
     psd : DataFrame
         A Pandas DataFrame containing a 'Frequency' and 'Power' column.
+    weighted : bool, optional
+        If True, weights the difference of each bin m from the first bin by
+        1/m, as in the standard definition of the spectral decrease. If False,
+        weights every difference by 1/N. The default is False.
 
     Raises
     ------
@@ -890,12 +1238,14 @@ def CalcSDec(psd):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    N = psd.shape[0]
-    vals = np.array(psd['Power'])
-    SDec = np.sum((vals[1:] - vals[0])/N) / np.sum(vals[1:])
+    diffs = power[1:] - power[0]
+    if weighted:
+        diffs /= np.arange(1, len(power))
+    else:
+        diffs /= len(power)
+    SDec = np.sum(diffs) / np.sum(power[1:])
     return SDec
 
 #
@@ -924,10 +1274,9 @@ def CalcSEntropy(psd):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
-    prob = psd['Power'] / np.sum(psd['Power'])
+    prob = power / np.sum(power)
     SEntropy = -np.sum(prob * np.log(prob))
     return SEntropy
 
@@ -962,22 +1311,16 @@ def CalcSRoll(psd, percent=0.85):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
     if percent <= 0 or percent >= 1:
         raise Exception("percent must be between 0 and 1")
     
-    total_prob = 0
-    total_power = np.sum(psd['Power'])
-    # Make copy and reset rows to iterate over them
-    psdCalc = psd.copy()
-    psdCalc = psdCalc.reset_index()
-    for i in range(len(psdCalc)):
-        prob = psdCalc.loc[i, 'Power'] / total_power
-        total_prob += prob
-        if total_power >= percent:
-            return psdCalc.loc[i, 'Frequency']
+    # Find the first frequency where the cumulative power reaches percent of
+    # the total power
+    total_power = np.cumsum(power)
+    ind = np.searchsorted(total_power, percent * total_power[-1])
+    return frequency[ind]
 
 #
 # =============================================================================
@@ -1010,21 +1353,246 @@ def CalcSBW(psd, p=2):
 
     """
     
-    if set(psd.columns.values) != {'Frequency', 'Power'}:
-        raise Exception("psd must be a Power Spectrum Density dataframe with only a 'Frequency' and 'Power' column")
+    frequency, power = _GetPSD(psd)
     
     if p <= 0:
         raise Exception("p must be greater than 0")
     
     cent = CalcSC(psd)
-    SBW = (np.sum(psd['Power'] * (psd['Frequency'] - cent) ** p)) ** (1/p)
+    SBW = (np.sum(power * (frequency - cent) ** p)) ** (1/p)
     return SBW
 
 #
 # =============================================================================
 #
 
-def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None, expression=None, file_ext='csv', short_name=True):
+def _SpectralFeatures(frequency, power, freq=60):
+    """
+    Calculate all spectral features of a PSD together, sharing the total
+    power, cumulative power, logarithms and twitch frequency ranges between
+    them. Each value is the same as the one returned by the corresponding
+    Calc function with its default parameters.
+
+    Parameters
+    ----------
+    frequency : ndarray
+        Frequencies of the PSD.
+    power : ndarray
+        Power at each frequency of the PSD.
+    freq : float, optional
+        Frequency threshold of the twitch features. The default is 60.
+
+    Returns
+    -------
+    features : dict
+        Dictionary of feature names ('Max_Freq', 'MDF', 'MNF', 'Twitch_Ratio',
+        'Twitch_Index', 'Twitch_Slope_Fast', 'Twitch_Slope_Slow',
+        'Spec_Centroid', 'Spec_Flatness', 'Spec_Spread', 'Spec_Decrease',
+        'Spec_Entropy', 'Spec_Rolloff', 'Spec_Bandwidth') and their values.
+
+    """
+    
+    N = len(power)
+    
+    # Shared sums of the power
+    prefix_sum = np.cumsum(power)
+    total = prefix_sum[-1]
+    log_power = np.log(power)
+    
+    # Centroid, shared by the spread and bandwidth
+    SC = np.dot(power, frequency) / total
+    dev = frequency - SC
+    weighted_sq = np.dot(power, dev * dev)
+    
+    # Twitch frequency ranges
+    fast = frequency > freq
+    slow = frequency < freq
+    fast_power = power[fast]
+    slow_power = power[slow]
+    
+    # Spectral decrease, from the power after the first frequency
+    rest = total - power[0]
+    
+    return {
+        'Max_Freq': frequency[np.argmax(power)],
+        'MDF': frequency[np.argmin(np.abs(2*prefix_sum - total - power))],
+        'MNF': SC,
+        'Twitch_Ratio': np.sum(fast_power) / np.sum(slow_power),
+        'Twitch_Index': (np.max(fast_power) if len(fast_power) > 0 else np.nan) / (np.max(slow_power) if len(slow_power) > 0 else np.nan),
+        'Twitch_Slope_Fast': _Slope(frequency[fast], fast_power),
+        'Twitch_Slope_Slow': _Slope(frequency[slow], slow_power),
+        'Spec_Centroid': SC,
+        'Spec_Flatness': np.exp(np.mean(log_power)) / (total / N),
+        'Spec_Spread': weighted_sq / total,
+        'Spec_Decrease': (rest - (N - 1) * power[0]) / (N * rest),
+        'Spec_Entropy': np.log(total) - np.dot(power, log_power) / total,
+        'Spec_Rolloff': frequency[np.searchsorted(prefix_sum, 0.85 * total)],
+        'Spec_Bandwidth': np.sqrt(weighted_sq)
+    }
+
+#
+# =============================================================================
+#
+
+def _BasicStats(vals):
+    """
+    Calculate the basic statistics of one or more Signals along the last axis
+    of vals, sharing the mean and central moments between them. The SD uses
+    no degrees of freedom correction, and the skew and kurtosis match
+    scipy.stats.skew and scipy.stats.kurtosis with their default (biased,
+    Fisher) settings.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal, or a 2D array with one Signal per row.
+
+    Returns
+    -------
+    Min : float
+        Minimum of the Signal.
+    Max : float
+        Maximum of the Signal.
+    Mean : float
+        Mean of the Signal.
+    SD : float
+        Standard deviation of the Signal.
+    Skew : float
+        Skew of the Signal.
+    Kurtosis : float
+        Kurtosis of the Signal.
+    
+    Each value is an array with one value per row of vals if vals is 2D.
+
+    """
+    
+    N = vals.shape[-1]
+    mean = np.mean(vals, axis=-1, keepdims=True)
+    dev = vals - mean
+    dev_sq = dev * dev
+    
+    # Central moments
+    m2 = np.mean(dev_sq, axis=-1)
+    m3 = _SumProducts(dev_sq, dev) / N
+    m4 = _SumProducts(dev_sq, dev_sq) / N
+    
+    SD = np.sqrt(m2)
+    Skew = m3 / m2 ** 1.5
+    Kurtosis = m4 / m2 ** 2 - 3
+    
+    return np.min(vals, axis=-1), np.max(vals, axis=-1), mean[..., 0], SD, Skew, Kurtosis
+
+#
+# =============================================================================
+#
+
+def _ExtractFileFeatures(task):
+    """
+    Calculate the features of every column of one file, for ExtractFeatures.
+    Defined at module level so that it can be sent to worker processes.
+
+    Parameters
+    ----------
+    task : tuple
+        A (file, path_b, path_s, cols, sampling_rate, file_ext, short_name)
+        tuple, where path_b and path_s are the paths of the bandpass and
+        smoothed versions of the file.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column in cols is not in either file.
+
+    Returns
+    -------
+    df_vals : list
+        Row of the feature file for this file, starting with its ID.
+
+    """
+    
+    (file, path_b, path_s, cols, sampling_rate, file_ext, short_name) = task
+    
+    # Read file
+    data_b = ReadFileType(path_b, file_ext)
+    data_s = ReadFileType(path_s, file_ext)
+    
+    for col in cols:
+        if col not in data_b.columns:
+            raise Exception("Bandpass file " + file + " does not contain column " + col)
+        if col not in data_s.columns:
+            raise Exception("Smooth file " + file + " does not contain column " + col)
+    
+    # Calculate ID
+    if short_name:
+        File_ID = file
+    else:
+        File_ID = path_s
+     
+    # Take the columns as one contiguous array with a row per column, so every
+    # time-series measure is calculated for all columns at once
+    vals = np.ascontiguousarray(data_s[cols].to_numpy(dtype=np.float64).T)
+    Min, Max, Mean, SD, Skew, Kurtosis = _BasicStats(vals)
+    time_features = _TimeFeatures(vals, sampling_rate)
+    Spectral_Flux = _SplitSpecFlux(vals.T, 0.5, sampling_rate)
+    
+    # Calculate the PSDs of all columns in one batched FFT
+    frequency, powers, _ = _EMG2PSDArrays(data_b[cols].to_numpy(dtype=np.float64), sampling_rate=sampling_rate)
+    powers = np.ascontiguousarray(powers.T)
+    
+    df_vals = [File_ID]
+    # Evaluate the measures of each column
+    for i in range(len(cols)):
+        
+        # Calculate spectral features
+        spectral_features = _SpectralFeatures(frequency, powers[i])
+        
+        # Append to list of values
+        col_vals = [
+            Min[i],
+            Max[i],
+            Mean[i],
+            SD[i],
+            Skew[i],
+            Kurtosis[i],
+            
+            time_features['IEMG'][i],
+            time_features['MAV'][i],
+            time_features['MMAV'][i],
+            time_features['SSI'][i],
+            time_features['VAR'][i],
+            time_features['VOrder'][i],
+            time_features['RMS'][i],
+            time_features['WL'][i],
+            time_features['LOG'][i],
+            time_features['MFL'][i],
+            time_features['AP'][i],
+            Spectral_Flux[i],
+            
+            spectral_features['Max_Freq'],
+            spectral_features['MDF'],
+            spectral_features['MNF'],
+            spectral_features['Twitch_Ratio'],
+            spectral_features['Twitch_Index'],
+            spectral_features['Twitch_Slope_Fast'],
+            spectral_features['Twitch_Slope_Slow'],
+            spectral_features['Spec_Centroid'],
+            spectral_features['Spec_Flatness'],
+            spectral_features['Spec_Spread'],
+            spectral_features['Spec_Decrease'],
+            spectral_features['Spec_Entropy'],
+            spectral_features['Spec_Rolloff'],
+            spectral_features['Spec_Bandwidth']
+        ]
+        
+        df_vals = df_vals + col_vals
+    
+    return df_vals
+
+#
+# =============================================================================
+#
+
+def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None, expression=None, file_ext='csv', short_name=True, return_df=True, workers=None):
     """
     Analyze Signals by performing a collection of analyses on them and saving a
     feature file.
@@ -1058,6 +1626,14 @@ def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None,
         If true, makes the key column of the feature files the name of the
         file. If false, uses the file path to ensure unique keys. The default
         is True.
+    return_df : bool, optional
+        If True, also returns the features as a DataFrame. If False, the rows
+        are only written to the feature file as they are calculated, and are
+        not kept in memory. The default is True.
+    workers : int, optional
+        Number of worker processes to analyze files in, one file per process.
+        The default is None, in which case one process per CPU is used. If 1,
+        files are analyzed in the calling process.
 
     Raises
     ------
@@ -1078,13 +1654,16 @@ def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None,
 
     Returns
     -------
-    None.
+    SignalDF : DataFrame
+        A DataFrame of the features, with one row per file. None if return_df
+        is False.
 
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -1095,8 +1674,8 @@ def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None,
     
     # Directories don't have to have the same file structure, but
     # Must have files with the same name
-    filedirs_b = MapFiles(in_bandpass, file_ext=file_ext, expression=expression)
-    filedirs_s = MapFiles(in_smooth, file_ext=file_ext, expression=expression)
+    filedirs_b = MapFiles(in_bandpass, file_ext=file_ext, expression=pattern)
+    filedirs_s = MapFiles(in_smooth, file_ext=file_ext, expression=pattern)
     if len(filedirs_b) == 0 or len(filedirs_s) == 0:
         warnings.warn("Warning: The regular expression " + expression + " did not match with any files.")
     
@@ -1139,11 +1718,9 @@ def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None,
         'Spec_Bandwidth'
     ]
     
-    # Read the first file to get column names
-    if cols == None:
-        path1 = next(iter(filedirs_s.values()))
-        data1 = ReadFileType(path1, file_ext)
-        cols = list(data1.columns)
+    # Read the header of the first file to get column names
+    if (cols is None) and (len(filedirs_s) > 0):
+        cols = ReadFileColumns(next(iter(filedirs_s.values())), file_ext)
         if 'Time' in cols:
             cols.remove('Time')
     
@@ -1154,109 +1731,39 @@ def ExtractFeatures(in_bandpass, in_smooth, out_path, sampling_rate, cols=None,
         for measure in measure_names:
             df_names.append(col + '_' + measure)
     
-    SignalDF = pd.DataFrame(columns=df_names)
-    
-    # Apply transformations
-    for file in tqdm(filedirs_b):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            
-            # Read file
-            data_b = ReadFileType(filedirs_b[file], file_ext)
-            data_s = ReadFileType(filedirs_s[file], file_ext)
-            
-            if col not in list(data_b.columns.values):
-                raise Exception("Bandpass file " + file + " does not contain column " + col)
-            if col not in list(data_s.columns.values):
-                raise Exception("Smooth file " + file + " does not contain column " + col)
-            
-            # Calculate ID
-            if short_name:
-                File_ID = file
-            else:
-                File_ID = filedirs_s[file]
-             
-            df_vals = [File_ID]
-            # Evaluate the measures of each column
-            for col in cols:
-                
-                # Calculate time-series measures
-                Min = np.min(data_s[col])
-                Max = np.max(data_s[col])
-                Mean = np.mean(data_s[col])
-                SD = np.std(data_s[col])
-                Skew = scipy.stats.skew(data_s[col])
-                Kurtosis = scipy.stats.kurtosis(data_s[col])
-                IEMG = CalcIEMG(data_s, col, sampling_rate)
-                MAV = CalcMAV(data_s, col)
-                MMAV = CalcMMAV(data_s, col)
-                SSI = CalcSSI(data_s, col, sampling_rate)
-                VAR = CalcVAR(data_s, col)
-                VOrder = CalcVOrder(data_s, col)
-                RMS = CalcRMS(data_s, col)
-                WL = CalcWL(data_s, col)
-                LOG = CalcLOG(data_s, col)
-                MFL = CalcMFL(data_s, col)
-                AP = CalcAP(data_s, col)
-                Spectral_Flux = CalcSpecFlux(data_s, 0.5, col, sampling_rate)
-    
-                # Calculate spectral features
-                psd = EMG2PSD(data_b[col], sampling_rate=sampling_rate)
-                Max_Freq = psd.iloc[psd['Power'].idxmax()]['Frequency']
-                MDF = CalcMDF(psd)
-                MNF = CalcMNF(psd)
-                Twitch_Ratio = CalcTwitchRatio(psd)
-                Twitch_Index = CalcTwitchIndex(psd)
-                Fast_Twitch_Slope, Slow_Twitch_Slope = CalcTwitchSlope(psd)
-                Spectral_Centroid = CalcSC(psd)
-                Spectral_Flatness = CalcSF(psd)
-                Spectral_Spread = CalcSS(psd)
-                Spectral_Decrease = CalcSDec(psd)
-                Spectral_Entropy = CalcSEntropy(psd)
-                Spectral_Rolloff = CalcSRoll(psd)
-                Spectral_Bandwidth = CalcSBW(psd, 2)
-                
-                # Append to list of values
-                col_vals = [
-                    Min,
-                    Max,
-                    Mean,
-                    SD,
-                    Skew,
-                    Kurtosis,
-                    
-                    IEMG,
-                    MAV,
-                    MMAV,
-                    SSI,
-                    VAR,
-                    VOrder,
-                    RMS,
-                    WL,
-                    LOG,
-                    MFL,
-                    AP,
-                    Spectral_Flux,
-                    
-                    Max_Freq,
-                    MDF,
-                    MNF,
-                    Twitch_Ratio,
-                    Twitch_Index,
-                    Fast_Twitch_Slope,
-                    Slow_Twitch_Slope,
-                    Spectral_Centroid,
-                    Spectral_Flatness,
-                    Spectral_Spread,
-                    Spectral_Decrease,
-                    Spectral_Entropy,
-                    Spectral_Rolloff,
-                    Spectral_Bandwidth
-                ]
-                
-                df_vals = df_vals + col_vals
-            
-            # Add values to the dataframe
-            SignalDF.loc[len(SignalDF.index)] = df_vals
-            
-    SignalDF.to_csv(out_path + 'Features.csv', index=False)
+    # Collect the files to analyze
+    tasks = []
+    for file, path_b in filedirs_b.items():
+        if file.endswith(file_ext) and ((pattern is None) or (pattern.match(file))):
+            tasks.append((file, path_b, filedirs_s[file], cols, sampling_rate, file_ext, short_name))
+    
+    # Start no more workers than there are files
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    
+    # Analyze files in parallel, writing each row to the feature file in order
+    # as soon as it is calculated
+    rows = []
+    with ExitStack() as stack:
+        f = stack.enter_context(open(out_path + 'Features.csv', 'w', newline=''))
+        if workers > 1:
+            ex = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            results = ex.map(_ExtractFileFeatures, tasks)
+        else:
+            results = map(_ExtractFileFeatures, tasks)
+        
+        writer = csv.writer(f)
+        writer.writerow(df_names)
+        for row in tqdm(results, total=len(tasks)):
+            # Write missing values as empty fields, as pandas does
+            writer.writerow(['' if val != val else val for val in row])
+            if return_df:
+                rows.append(row)
+    
+    if not return_df:
+        return None
+    
+    # Create dataframe of values
+    SignalDF = pd.DataFrame(rows, columns=df_names)
     return SignalDF
@@ -1,7 +1,19 @@
 import pandas as pd
+import numpy as np
 import re
 import os
 
+# PyArrow is optional, and is used to speed up reading CSV files and to read
+# and write parquet files
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pacsv = None
+    pq = None
+
 #
 # =============================================================================
 #
@@ -14,7 +26,43 @@ A collection of functions for accessing files.
 # =============================================================================
 #
 
-def ReadFileType(path, file_ext):
+def _CastSchema(schema, dtype, cols=None):
+    """
+    Build the schema to cast the Signal columns of a PyArrow table to dtype.
+
+    Parameters
+    ----------
+    schema : pa.Schema
+        Schema of the table to cast.
+    dtype : type
+        Numeric type to cast the Signal columns to.
+    cols : list, optional
+        List of columns to cast. The default is None, in which case every
+        numeric column except 'Time' is cast.
+
+    Returns
+    -------
+    pa.Schema
+        Schema with the Signal columns set to dtype, and every other column
+        left as is.
+
+    """
+    
+    target = pa.from_numpy_dtype(np.dtype(dtype))
+    fields = []
+    for field in schema:
+        if cols is not None:
+            cast = field.name in cols
+        else:
+            cast = (field.name != 'Time') and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+        fields.append((field.name, target if cast else field.type))
+    return pa.schema(fields)
+
+#
+# =============================================================================
+#
+
+def ReadFileType(path, file_ext, use_fast_io=True, cols=None, dtype=None):
     """
     Safe wrapper for reading files of a given extension.
 
@@ -23,7 +71,21 @@ def ReadFileType(path, file_ext):
     path : str
         Path of file to read.
     file_ext : str
-        File extension to read.
+        File extension to read. Either 'csv', or 'parquet' if PyArrow is
+        installed.
+    use_fast_io : bool, optional
+        If True and PyArrow is installed, CSV files are parsed with PyArrow's
+        multithreaded reader, falling back to Pandas if it fails. The default
+        is True.
+    cols : list, optional
+        List of columns to read. Other columns are skipped by the parser. The
+        default is None, in which case all columns are read.
+    dtype : type, optional
+        Numeric type to parse the Signal columns as, such as np.float32 to
+        halve the memory used by the Signal. If cols is given, the columns in
+        cols are parsed as dtype. Otherwise every numeric column except 'Time'
+        is, so that 'Time' keeps its precision. The default is None, in which
+        case the parser infers the types.
 
     Raises
     ------
@@ -41,10 +103,45 @@ def ReadFileType(path, file_ext):
     """
     
     if file_ext == 'csv':
+        file = None
+        if use_fast_io and pacsv is not None:
+            try:
+                # Parse in 8 MB blocks, so that large Signal files are split
+                # across fewer, larger blocks per thread. When the columns are
+                # known, they are parsed straight into dtype
+                column_types = None
+                if dtype is not None and cols is not None:
+                    column_types = {col: pa.from_numpy_dtype(np.dtype(dtype)) for col in cols}
+                table = pacsv.read_csv(path,
+                                       read_options=pacsv.ReadOptions(use_threads=True, block_size=8 << 20),
+                                       convert_options=pacsv.ConvertOptions(include_columns=cols, column_types=column_types))
+                if dtype is not None and cols is None:
+                    table = table.cast(_CastSchema(table.schema, dtype))
+                # Give each column its own block, so the table's buffers are
+                # released as they are converted instead of being consolidated
+                file = table.to_pandas(self_destruct=True, split_blocks=True)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                file = None
+        if file is None:
+            try:
+                if dtype is not None and cols is not None:
+                    file = pd.read_csv(path, usecols=cols, dtype={col: dtype for col in cols})
+                else:
+                    file = pd.read_csv(path, usecols=cols)
+            except:
+                raise Exception("CSV file could not be read: " + path)
+            if dtype is not None and cols is None:
+                signal_cols = [col for col in file.select_dtypes('number').columns if col != 'Time']
+                file[signal_cols] = file[signal_cols].astype(dtype)
+    elif file_ext == 'parquet' and pq is not None:
         try:
-            file = pd.read_csv(path)
+            # Memory map the file, so its columns are read without copying
+            table = pq.read_table(path, columns=cols, memory_map=True)
+            if dtype is not None:
+                table = table.cast(_CastSchema(table.schema, dtype, cols))
+            file = table.to_pandas(self_destruct=True, split_blocks=True)
         except:
-            raise Exception("CSV file could not be read: " + path)
+            raise Exception("Parquet file could not be read: " + path)
     else:
         raise Exception("Unsupported file format provided: " + file_ext)
         
@@ -54,6 +151,101 @@ def ReadFileType(path, file_ext):
 # =============================================================================
 #
 
+def WriteFileType(data, path, file_ext, use_fast_io=True):
+    """
+    Safe wrapper for writing files of a given extension.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Data frame to write.
+    path : str
+        Path of file to write.
+    file_ext : str
+        File extension to write. Either 'csv', or 'parquet' if PyArrow is
+        installed.
+    use_fast_io : bool, optional
+        If True and PyArrow is installed, CSV files are written with PyArrow's
+        CSV writer, falling back to Pandas if it fails. The default is True.
+
+    Raises
+    ------
+    Exception
+        Raises an exception if an unsupported file format was provided for
+        file_ext.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    if file_ext == 'csv':
+        written = False
+        if use_fast_io and pacsv is not None:
+            try:
+                pacsv.write_csv(pa.Table.from_pandas(data, preserve_index=False), path,
+                                write_options=pacsv.WriteOptions(quoting_style='needed'))
+                written = True
+            except:
+                written = False
+        if not written:
+            data.to_csv(path, index=False)
+    elif file_ext == 'parquet' and pq is not None:
+        pq.write_table(pa.Table.from_pandas(data, preserve_index=False), path)
+    else:
+        raise Exception("Unsupported file format provided: " + file_ext)
+
+#
+# =============================================================================
+#
+
+def ReadFileColumns(path, file_ext):
+    """
+    Safe wrapper for reading the column names of a file of a given extension,
+    without reading its contents.
+
+    Parameters
+    ----------
+    path : str
+        Path of file to read.
+    file_ext : str
+        File extension to read.
+
+    Raises
+    ------
+    Exception
+        Raises an exception if the file could not be read.
+    Exception
+        Raises an exception if an unsupported file format was provided for
+        file_ext.
+
+    Returns
+    -------
+    columns : list
+        Returns a list of the column names of the file.
+
+    """
+    
+    if file_ext == 'csv':
+        try:
+            columns = list(pd.read_csv(path, nrows=0).columns)
+        except:
+            raise Exception("CSV file could not be read: " + path)
+    elif file_ext == 'parquet' and pq is not None:
+        try:
+            columns = list(pq.read_schema(path).names)
+        except:
+            raise Exception("Parquet file could not be read: " + path)
+    else:
+        raise Exception("Unsupported file format provided: " + file_ext)
+    
+    return columns
+
+#
+# =============================================================================
+#
+
 def MapFiles(in_path, file_ext='csv', expression=None):
     """
     Generate a dictionary of file names and locations from the subfiles of a
@@ -66,8 +258,9 @@ def MapFiles(in_path, file_ext='csv', expression=None):
     file_ext : str, optional
         File extension for files to read. The default is 'csv'.
     expression : str, optional
-        A regular expression. If provided, will only count files whose names
-        match the regular expression. The default is None.
+        A regular expression, which may already be compiled. If provided, will
+        only count files whose names match the regular expression. The
+        default is None.
 
     Raises
     ------
@@ -82,20 +275,31 @@ def MapFiles(in_path, file_ext='csv', expression=None):
 
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
+    # List the entries of a folder in name order, using scandir so they don't
+    # need to be stat'ed again
+    def SortedEntries(folder):
+        with os.scandir(folder) as entries:
+            return iter(sorted(entries, key=lambda entry: entry.name))
+    
     filedirs = {}
-    for file in os.listdir(in_path):
-        new_path = os.path.join(in_path, file)
-        if os.path.isdir(new_path):
-            subDir = MapFiles(new_path, file_ext=file_ext, expression=expression)
-            filedirs.update(subDir)
-        elif (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            filedirs[file] = new_path
+    # Walk the folder tree depth first, entering each subfolder where it
+    # comes in name order, with a stack of the entries left in each folder
+    stack = [SortedEntries(in_path)]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+        elif entry.is_dir():
+            stack.append(SortedEntries(entry.path))
+        elif entry.name.endswith(file_ext) and ((pattern is None) or (pattern.match(entry.name))):
+            filedirs[entry.name] = entry.path
     return filedirs
 
 #
@@ -116,8 +320,9 @@ def ConvertMapFiles(fileObj, file_ext='csv', expression=None):
         File extension for files to read. Only reads files with this extension.
         The default is 'csv'.
     expression : str, optional
-        A regular expression. If provided, will only count files whose names
-        match the regular expression. The default is None.
+        A regular expression, which may already be compiled. If provided, will
+        only count files whose names match the regular expression. The
+        default is None.
 
     Raises
     ------
@@ -135,9 +340,10 @@ def ConvertMapFiles(fileObj, file_ext='csv', expression=None):
     
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -145,17 +351,12 @@ def ConvertMapFiles(fileObj, file_ext='csv', expression=None):
     if type(fileObj) is str:
         if not os.path.isabs(fileObj):
             fileObj = os.path.abspath(fileObj)
-        filedirs = MapFiles(in_path=fileObj, file_ext=file_ext, expression=expression)
+        filedirs = MapFiles(in_path=fileObj, file_ext=file_ext, expression=pattern)
     # User provided a processed file directory
     elif type(fileObj) is dict:
         # If expression is provided, filters the dictionary
-        # for all entries matching it
-        fd = fileObj.copy()
-        if expression != None:
-            for file in fd:
-                if not (re.match(expression, fd[file])):
-                    del fd[file]
-        filedirs = fd
+        # for all file names matching it
+        filedirs = {file: path for file, path in fileObj.items() if (pattern is None) or (pattern.match(file))}
     # Provided file location format is unsupported
     else:
         raise Exception("Unsupported file location format:", type(fileObj))
@@ -195,19 +396,16 @@ def MapFilesFuse(filedirs, names):
     
     """
     
-    data = []
     # Assumes all files listed in first file directory
     # exists in the others
-    for file in filedirs[0].keys():
-        # Create row
-        row = [file, file]
-        for i, filedir in enumerate(filedirs):
-            if file not in filedir:
-                # Raise exception if file does not exist
-                raise Exception('File ' + file + ' does not exist in file directory ' + names[i])
-            row.append(filedir[file])
-        # Add row to data frame
-        data.append(row)
+    files = list(filedirs[0].keys())
+    data = {'ID': files, 'File': files}
+    for name, filedir in zip(names, filedirs):
+        try:
+            data[name] = [filedir[file] for file in files]
+        except KeyError as e:
+            # Raise exception if file does not exist
+            raise Exception('File ' + e.args[0] + ' does not exist in file directory ' + name)
     # Create data frame
     df = pd.DataFrame(data, columns=['ID', 'File'] + names)
     df.set_index('ID',inplace=True)
@@ -1,13 +1,14 @@
 import pandas as pd
 import numpy as np
-import scipy.optimize
 import os
 import re
 import warnings
-from scipy.signal import argrelextrema
+import scipy.fft
+from scipy.signal import find_peaks
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
-from .PreprocessSignals import EMG2PSD
+from .PreprocessSignals import _EMG2PSDArrays
 from .FileAccess import *
 
 #
@@ -22,6 +23,173 @@ A collection of functions for finding outliers while testing
 # =============================================================================
 #
 
+def _ReadColumns(path, file_ext, cols, chunksize=1000000):
+    """
+    Read selected columns of a Signal file in chunks, so that only the needed
+    columns are ever held in memory.
+
+    Parameters
+    ----------
+    path : str
+        Path of file to read.
+    file_ext : str
+        File extension to read.
+    cols : list
+        List of columns of the Signal to read.
+    chunksize : int, optional
+        Number of rows to parse at a time. The default is 1000000.
+
+    Raises
+    ------
+    Exception
+        Raises an exception if the file could not be read.
+    Exception
+        Raises an exception if an unsupported file format was provided for
+        file_ext.
+
+    Returns
+    -------
+    data : ndarray
+        A float32 array with one row per sample and one column per column in
+        cols.
+
+    """
+    
+    # Only CSV files are read in chunks, other formats read just the columns
+    if file_ext != 'csv':
+        return ReadFileType(path, file_ext, cols=cols, dtype=np.float32)[cols].to_numpy()
+    
+    try:
+        # Every row ends in a line break except maybe the last, and the header
+        # takes one, so the line breaks bound the number of rows
+        n_rows = 0
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                n_rows += block.count(b'\n')
+        
+        # Parse each chunk straight into one preallocated array
+        data = np.empty((n_rows, len(cols)), dtype=np.float32)
+        n = 0
+        for chunk in pd.read_csv(path, usecols=cols, chunksize=chunksize):
+            data[n:n + len(chunk)] = chunk[cols].to_numpy(dtype=np.float32)
+            n += len(chunk)
+    except:
+        raise Exception("CSV file could not be read: " + path)
+    
+    return data[:n]
+
+#
+# =============================================================================
+#
+
+def _LoadSignal(file, path, file_ext, cols):
+    """
+    Check that a Signal file has the requested columns, then read them.
+
+    Parameters
+    ----------
+    file : str
+        Name of the file to read.
+    path : str
+        Path of file to read.
+    file_ext : str
+        File extension to read.
+    cols : list
+        List of columns of the Signal to read.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column in cols is not in the data file.
+    Exception
+        Raises an exception if the file could not be read.
+
+    Returns
+    -------
+    data : ndarray
+        A float32 array with one row per sample and one column per column in
+        cols.
+
+    """
+    
+    header = set(ReadFileColumns(path, file_ext))
+    for col in cols:
+        if col not in header:
+            raise Exception("Column " + col + " not in Signal " + file)
+    
+    # Stream only the needed columns into memory
+    return _ReadColumns(path, file_ext, cols)
+
+#
+# =============================================================================
+#
+
+def _Rational(x, params, p_deg=1):
+    """
+    Evaluate a rational function p(x)/q(x).
+
+    Parameters
+    ----------
+    x : ndarray
+        Points to evaluate the function at.
+    params : ndarray
+        Coefficients of p followed by the coefficients of q, each from the
+        highest power down.
+    p_deg : int, optional
+        Number of coefficients of p. The default is 1.
+
+    Returns
+    -------
+    ndarray
+        Value of the rational function at each point in x.
+
+    """
+    
+    p = params[:p_deg]
+    q = params[p_deg:]
+    return np.polyval(p, x) / np.polyval(q, x)
+
+#
+# =============================================================================
+#
+
+def _FitRational(x, y, p_deg=1, q_deg=2):
+    """
+    Fit a rational function p(x)/q(x) to points by linear least squares.
+    
+    The constant term of q is fixed to 1, and y*q(x) = p(x) is solved instead
+    of minimizing the residuals of y = p(x)/q(x). This avoids an iterative
+    fit, but weights the points by q(x), so the parameters can differ from a
+    nonlinear least squares fit of noisy data.
+
+    Parameters
+    ----------
+    x : ndarray
+        x values of the points to fit.
+    y : ndarray
+        y values of the points to fit.
+    p_deg : int, optional
+        Number of coefficients of p. The default is 1.
+    q_deg : int, optional
+        Number of coefficients of q. The default is 2.
+
+    Returns
+    -------
+    ndarray
+        Coefficients of p followed by the coefficients of q, each from the
+        highest power down, in the form used by _Rational.
+
+    """
+    
+    A = [x**k for k in range(p_deg-1, -1, -1)]
+    A += [-y * x**k for k in range(q_deg-1, 0, -1)]
+    params = np.linalg.lstsq(np.column_stack(A), y, rcond=None)[0]
+    return np.append(params, 1)
+
+#
+# =============================================================================
+#
+
 def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=None, metric=np.median, expression=None, window_size=200, file_ext='csv'):
     """
     Looks at all Signals contained in a filepath, returns a dictionary of file
@@ -58,7 +226,8 @@ def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=
         A regular expression. If provided, will only search for outliers in
         files whose names match the regular expression. The default is None.
     window_size : int, optional
-        The window size to use when filtering for local maxima. The default is
+        The minimum distance, in frequency bins, between local maxima. Lower
+        maxima closer than this to a higher one are dropped. The default is
         200.
     file_ext : str, optional
         File extension for files to read. Only reads files with this extension.
@@ -95,9 +264,10 @@ def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=
 
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -124,17 +294,10 @@ def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=
     if low < 0 or high < 0:
         raise Exception("low and high must be positive values")
     
-    # Create rational function equation
-    def Rational(x, *params):
-        p = params[:p_deg]
-        q = params[p_deg:]
-        return np.polyval(p, x) / np.polyval(q, x)
-    
     # Zooms in on a frequency range in a PSD plot
-    def ZoomIn(data, a, b):
-        data = data[data['Frequency'] >= a]
-        data = data[data['Frequency'] <= b]
-        return data
+    def ZoomIn(frequency, power, a, b):
+        mask = (frequency >= a) & (frequency <= b)
+        return frequency[mask], power[mask]
     
     outliers = {}
     
@@ -143,66 +306,69 @@ def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=
         in_path = os.path.abspath(in_path)
     
     # Get dictionary of files
-    filedirs = MapFiles(in_path, file_ext=file_ext, expression=expression)
+    filedirs = MapFiles(in_path, file_ext=file_ext, expression=pattern)
     
-    # Iterate over detected files
-    for file in tqdm(filedirs):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            
-            # Read file
-            data = ReadFileType(filedirs[file], file_ext)
+    # Select files to search
+    tasks = [(file, path) for file, path in filedirs.items() if file.endswith(file_ext) and ((pattern is None) or (pattern.match(file)))]
+    
+    # If no columns selected, apply filter to all columns except time
+    if cols is None and len(tasks) > 0:
+        cols = ReadFileColumns(tasks[0][1], file_ext)
+        if 'Time' in cols:
+            cols.remove('Time')
+    
+    # Read the next file in the background while the current one is searched,
+    # and let the PSD FFTs use every CPU
+    with ThreadPoolExecutor(max_workers=1) as ex, scipy.fft.set_workers(-1):
+        if len(tasks) > 0:
+            future = ex.submit(_LoadSignal, *tasks[0], file_ext, cols)
+        
+        # Iterate over detected files
+        for n, (file, path) in enumerate(tqdm(tasks)):
+            data = future.result()
+            if n + 1 < len(tasks):
+                future = ex.submit(_LoadSignal, *tasks[n + 1], file_ext, cols)
             
-            if len(data.index)/2 <= window_size:
+            if len(data)/2 <= window_size:
                 warnings.warn("Warning: Window size is greater than 1/2 of data file, results may be poor.")
             
-            # If no columns selected, apply filter to all columns except time
-            if cols is None:
-                cols = list(data.columns)
-                if 'Time' in cols:
-                    cols.remove('Time')
-            
             # Set to false
             isOutlier = False
             
+            # Calculate the PSDs of all columns at once. The samples are read
+            # as float32 to save memory, but the PSDs and the fit are done in
+            # double precision so verdicts match Signals read as float64
+            psd_frequency, psd_power, _ = _EMG2PSDArrays(data.astype(np.float64), sampling_rate=sampling_rate)
+            
             # Iterate over columns
             for i in range(len(cols)):
-                col = cols[i]
-                
-                if col not in list(data.columns.values):
-                    raise Exception("Column " + col + " not in Signal " + file)
-                
-                psd = EMG2PSD(data[col], sampling_rate=sampling_rate)
-                psd = ZoomIn(psd, low, high)
+                frequency, power = ZoomIn(psd_frequency, psd_power[:, i], low, high)
                 
-                # Create column containing local maxima
-                psd['max'] = psd.iloc[argrelextrema(psd['Power'].values, np.greater_equal, order=window_size)[0]]['Power']
+                # Find local maxima. Unlike the full +/- window_size check of
+                # argrelextrema, the ends of the band are never maxima, a flat
+                # top gives one maximum, and a peak is only dropped for a
+                # higher peak that is kept itself
+                peaks = find_peaks(power, distance=window_size)[0]
+                maxima_freq = frequency[peaks]
+                maxima_power = power[peaks]
                 
-                # Filter non-maxima
-                maxima = psd[psd['max'].notnull()]
-                
-                if len(maxima.index) == 1:
+                if len(peaks) <= 1:
                     raise Exception("Not enough maxima to create approximation - reduce window_size or use a larger data file.")
     
-                # Initialize rational function parameters
-                p_init = np.poly1d(np.ones(p_deg))
-                q_init = np.poly1d(np.ones(q_deg))
-                params_init = np.hstack((p_init.coeffs, q_init.coeffs))
-                
                 # Fit rational equation
-                params_best, params_cov = scipy.optimize.curve_fit(
-                    Rational, maxima['Frequency'], maxima['Power'], p0=params_init)
+                params_best = _FitRational(maxima_freq, maxima_power, p_deg=p_deg, q_deg=q_deg)
                 
                 # Get y-values
-                y_vals = Rational(maxima['Frequency'], *params_best)
+                y_vals = _Rational(maxima_freq, params_best, p_deg=p_deg)
                 
                 # Get differences between predicted and actual power levels
-                diffs = abs(y_vals - maxima['Power'])
+                diffs = np.abs(y_vals - maxima_power)
                 
                 # Get metric of data
                 data_metric = metric(diffs)
                 
                 # Find biggest difference between predicted and actual values
-                max_fit = np.max(maxima['Power'] - y_vals)
+                max_fit = np.max(maxima_power - y_vals)
                 
                 if (max_fit > data_metric * threshold):
                     print('\tOutlier in: ' + cols[i])
@@ -211,6 +377,6 @@ def DetectOutliers(in_path, sampling_rate, threshold, cols=None, low=None, high=
             # If any columns has an outlier, mark as an outlier
             if isOutlier:
                 # print('\tOutlier detected...')
-                outliers[file] = filedirs[file]
+                outliers[file] = path
                 
     return outliers
\ No newline at end of file
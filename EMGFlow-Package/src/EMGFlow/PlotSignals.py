@@ -1,9 +1,15 @@
 import pandas as pd
+import numpy as np
 import os
 import re
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import random
 import webbrowser
+import functools
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
 from shiny import App, render, ui
@@ -11,7 +17,7 @@ from shiny import App, render, ui
 import nest_asyncio
 nest_asyncio.apply()
 
-from .PreprocessSignals import EMG2PSD
+from .PreprocessSignals import _EMG2PSDArrays
 from .FileAccess import *
 
 #
@@ -26,7 +32,364 @@ A collection of functions for plotting subject data
 # =============================================================================
 #
 
-def PlotSpectrum(in_path, out_path, sampling_rate, cols=None, p=None, expression=None, file_ext='csv'):
+def _LoadPSD(file, path, cols, sampling_rate, file_ext, cache_dir=None):
+    """
+    Calculate the PSDs of the columns of a Signal file. If cache_dir is given,
+    the PSDs are saved in it, and reused for as long as the Signal file is not
+    modified.
+
+    Parameters
+    ----------
+    file : str
+        Name of the Signal file, used for error messages.
+    path : str
+        Path of the Signal file.
+    cols : list
+        List of columns of the Signal to calculate the PSDs of.
+    sampling_rate : float
+        Sampling rate of the Signal.
+    file_ext : str
+        File extension of the Signal file.
+    cache_dir : str, optional
+        Directory to read and write the PSDs of the Signal file from, as a
+        '.psd.npz' file named after the path of the Signal file. The default
+        is None, in which case the PSDs are not cached.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column is not in the dataframe.
+
+    Returns
+    -------
+    frequency : ndarray
+        Frequencies of the PSDs.
+    psd : dict
+        A dictionary of arrays, with the Power values of each column in cols.
+
+    """
+    
+    # Name the cache file after the full path of the Signal file, so that
+    # Signal files of the same name in different folders never share one
+    if cache_dir is not None:
+        key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+        cache_file = os.path.join(cache_dir, os.path.basename(path) + '.' + key + '.psd.npz')
+    
+    # Reuse cached PSDs if the Signal file has not changed since. The cache
+    # keeps its metadata and frequencies under fixed keys, and the powers in
+    # one array with a column per name in 'columns', so column names can
+    # never clash with them
+    frequency = None
+    psd = {}
+    if cache_dir is not None and os.path.exists(cache_file):
+        mtime = os.path.getmtime(path)
+        with np.load(cache_file) as cached:
+            if ({'mtime', 'sampling_rate', 'frequency', 'columns', 'power'} <= set(cached.files)
+                    and (float(cached['mtime']) == mtime) and (float(cached['sampling_rate']) == sampling_rate)):
+                frequency = cached['frequency']
+                power = cached['power']
+                psd = {str(col): power[:, i] for i, col in enumerate(cached['columns'])}
+    
+    # Only calculate the PSDs of columns that are not cached yet, so that
+    # plotting different columns of the same file adds to its cache
+    missing = [col for col in cols if col not in psd]
+    if len(missing) > 0:
+        header = set(ReadFileColumns(path, file_ext))
+        for col in missing:
+            if col not in header:
+                raise Exception("Column " + col + " not in Signal " + file)
+        
+        # Read only the needed columns
+        data = ReadFileType(path, file_ext, cols=missing, dtype=np.float32)
+        
+        # Calculate the PSDs of all columns at once, in double precision so
+        # they match those of Signals read as float64
+        frequency, power, _ = _EMG2PSDArrays(data[missing].to_numpy(dtype=np.float64), sampling_rate=sampling_rate)
+        for i, col in enumerate(missing):
+            psd[col] = power[:, i]
+        
+        if cache_dir is not None:
+            names = list(psd)
+            np.savez(cache_file, mtime=os.path.getmtime(path), sampling_rate=sampling_rate,
+                     frequency=frequency, columns=np.array(names, dtype=str),
+                     power=np.column_stack([psd[name] for name in names]))
+    
+    return frequency, {col: psd[col] for col in cols}
+
+#
+# =============================================================================
+#
+
+def _DecimatePSD(frequency, power, max_points=2000):
+    """
+    Reduce a PSD to at most max_points points for plotting. Each point keeps
+    the highest power of the frequencies it replaces, so narrow peaks remain
+    visible.
+
+    Parameters
+    ----------
+    frequency : float list
+        Frequencies of the PSD.
+    power : float list
+        Power of each frequency of the PSD.
+    max_points : int, optional
+        Maximum number of points to keep. The default is 2000.
+
+    Returns
+    -------
+    frequency : ndarray
+        Frequencies of the reduced PSD.
+    power : ndarray
+        Power of each frequency of the reduced PSD.
+
+    """
+    
+    frequency = np.asarray(frequency)
+    power = np.asarray(power)
+    
+    stride = max(1, len(frequency) // max_points)
+    if stride == 1:
+        return frequency, power
+    
+    starts = np.arange(0, len(frequency), stride)
+    return frequency[starts], np.maximum.reduceat(power, starts)
+
+#
+# =============================================================================
+#
+
+# Figures kept open by each process, keyed by their (rows, columns) layout
+_FIGURES = {}
+
+def _GetFigure(nrows, ncols, figsize):
+    """
+    Get a figure with the given layout. Figures are created once per process
+    and reused for every later plot with the same layout, instead of building
+    a new figure for every file. Use _DrawPSD to draw on its axes. Figures are
+    drawn on their own Agg canvas, without pyplot, so the user's matplotlib
+    backend is left untouched.
+
+    Parameters
+    ----------
+    nrows : int
+        Number of rows of subplots.
+    ncols : int
+        Number of columns of subplots.
+    figsize : (float, float) tuple
+        Size of the figure in inches.
+
+    Returns
+    -------
+    fig : Figure
+        The figure to draw on.
+    axs : Axes, ndarray
+        The axes of the figure, as returned by Figure.subplots.
+
+    """
+    
+    if (nrows, ncols) not in _FIGURES:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _FIGURES[(nrows, ncols)] = (fig, fig.subplots(nrows, ncols))
+    
+    return _FIGURES[(nrows, ncols)]
+
+#
+# =============================================================================
+#
+
+def _DrawPSD(ax, frequency, power):
+    """
+    Draw a PSD on an axis of a reused figure. The first PSD drawn creates the
+    line of the axis, and later PSDs only replace its data and rescale the
+    axis, instead of clearing and rebuilding the axis for every file.
+
+    Parameters
+    ----------
+    ax : Axes
+        Axis to draw on.
+    frequency : float list
+        Frequencies of the PSD.
+    power : float list
+        Power of each frequency of the PSD.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    frequency, power = _DecimatePSD(frequency, power)
+    
+    if len(ax.lines) == 0:
+        ax.plot(frequency, power, rasterized=True)
+    else:
+        ax.lines[0].set_data(frequency, power)
+        ax.relim()
+        ax.autoscale_view()
+
+#
+# =============================================================================
+#
+
+def _PlotSpectrumFile(task):
+    """
+    Generate and save the PSD plot of a single Signal file. Defined at module
+    level so it can be sent to worker processes by PlotSpectrum.
+
+    Parameters
+    ----------
+    task : tuple
+        A (file, path, out_path, sampling_rate, cols, file_ext, cache_dir)
+        tuple describing the file to plot.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column is not in the dataframe.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    (file, path, out_path, sampling_rate, cols, file_ext, cache_dir) = task
+    
+    # Calculate the PSDs of all columns at once
+    frequency, psd = _LoadPSD(file, path, cols, sampling_rate, file_ext, cache_dir)
+    
+    # Create plot, reusing this process's figure of the same layout
+    fig, axs = _GetFigure(1, len(cols), figsize=(15*len(cols),15))
+    
+    # Plot each column
+    if len(cols) == 1:
+        col = cols[0]
+        _DrawPSD(axs, frequency, psd[col])
+        axs.set_ylabel('Power magnitude')
+        axs.set_xlabel('Frequency')
+        axs.set_title(col)
+    
+    else:
+        for i in range(len(cols)):
+            col = cols[i]
+            _DrawPSD(axs[i], frequency, psd[col])
+            axs[i].set_ylabel('Power magnitude')
+            axs[i].set_xlabel('Frequency')
+            axs[i].set_title(col)
+    
+    # Set title and save figure
+    fig.suptitle(file + ' Power Spectrum Density')
+    fig.savefig(out_path + file[:-len(file_ext)] + 'png', dpi=100, pil_kwargs={'compress_level': 1})
+    return
+
+#
+# =============================================================================
+#
+
+def _PlotCompareFile(task):
+    """
+    Generate and save the PSD comparison plot of a single Signal file at two
+    processing stages. Defined at module level so it can be sent to worker
+    processes by PlotCompareSignals.
+
+    Parameters
+    ----------
+    task : tuple
+        A (file, path1, path2, out_path, sampling_rate, cols, file_ext,
+        cache_dir) tuple describing the file to plot.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column in cols is not in a dataframe.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    (file, path1, path2, out_path, sampling_rate, cols, file_ext, cache_dir) = task
+    
+    # Calculate the PSDs of all columns at once
+    frequency1, psd1 = _LoadPSD(file, path1, cols, sampling_rate, file_ext, cache_dir)
+    frequency2, psd2 = _LoadPSD(file, path2, cols, sampling_rate, file_ext, cache_dir)
+    
+    # Create plot, reusing this process's figure of the same layout
+    fig, axs = _GetFigure(2, len(cols), figsize=(15*len(cols),30))
+    
+    if len(cols) == 1:
+        col = cols[0]
+        
+        _DrawPSD(axs[0], frequency1, psd1[col])
+        axs[0].set_ylabel('Power magnitude')
+        axs[0].set_title(col)
+        
+        _DrawPSD(axs[1], frequency2, psd2[col])
+        axs[1].set_ylabel('Power magnitude')
+        axs[1].set_xlabel('Frequency')
+    
+    else:
+        # Plot each column
+        for i in range(len(cols)):
+            col = cols[i]
+            
+            _DrawPSD(axs[0,i], frequency1, psd1[col])
+            axs[0,i].set_ylabel('Power magnitude')
+            axs[0,i].set_title(col)
+            
+            _DrawPSD(axs[1,i], frequency2, psd2[col])
+            axs[1,i].set_ylabel('Power magnitude')
+            axs[1,i].set_xlabel('Frequency')
+    
+    # Set title and save figure
+    fig.suptitle(file + ' Power Spectrum Density')
+    fig.savefig(out_path + file[:-len(file_ext)] + 'png', dpi=100, pil_kwargs={'compress_level': 1})
+    return
+
+#
+# =============================================================================
+#
+
+def _RunTasks(func, tasks, workers):
+    """
+    Apply a function to each task, in worker processes if more than one
+    worker is requested.
+
+    Parameters
+    ----------
+    func : function
+        Function to call with each task.
+    tasks : list
+        List of tasks to pass to func.
+    workers : int
+        Number of worker processes to use. If None, one process per CPU is
+        used. If only one worker is needed, the tasks are run in the calling
+        process.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    
+    if workers <= 1:
+        for task in tqdm(tasks):
+            func(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            list(tqdm(ex.map(func, tasks), total=len(tasks)))
+
+#
+# =============================================================================
+#
+
+def PlotSpectrum(in_path, out_path, sampling_rate, cols=None, p=None, expression=None, file_ext='csv', cache_psd=False, cache_dir=None, workers=1):
     """
     Generate plots of the PSDs of each column of Signals in a directory
 
@@ -49,6 +412,16 @@ def PlotSpectrum(in_path, out_path, sampling_rate, cols=None, p=None, expression
         expression. The default is None.
     file_ext : str, optional
         File extension for files to read. Only reads files with this extension. The default is 'csv'.
+    cache_psd : bool, optional
+        If True, the PSDs of each Signal file are saved as a '.psd.npz' file in cache_dir, and reused by
+        later calls to PlotSpectrum or PlotCompareSignals until the Signal file is modified. The input
+        folders are never written to. The default is False.
+    cache_dir : str, optional
+        Directory to keep the cached PSDs in if cache_psd is True. The default is None, in which case a
+        'psd_cache' folder in out_path is used.
+    workers : int, optional
+        Number of worker processes to draw plots in, one file per process. The default is 1, in which case
+        plots are drawn in the calling process. If None, one process per CPU is used.
 
     Raises
     ------
@@ -73,9 +446,10 @@ def PlotSpectrum(in_path, out_path, sampling_rate, cols=None, p=None, expression
 
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -86,63 +460,41 @@ def PlotSpectrum(in_path, out_path, sampling_rate, cols=None, p=None, expression
     if not os.path.isabs(out_path):
         out_path = os.path.abspath(out_path)
     
-    filedirs = ConvertMapFiles(in_path, file_ext=file_ext, expression=expression)
+    # Keep cached PSDs out of the input folders
+    if not cache_psd:
+        cache_dir = None
+    elif cache_dir is None:
+        cache_dir = os.path.join(out_path, 'psd_cache')
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
     
-    # Make plots
-    for file in tqdm(filedirs):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
+    filedirs = ConvertMapFiles(in_path, file_ext=file_ext, expression=pattern)
+    
+    # If no columns selected, apply filter to all columns except time
+    if (cols is None) and (len(filedirs) > 0):
+        cols = ReadFileColumns(next(iter(filedirs.values())), file_ext)
+        if 'Time' in cols:
+            cols.remove('Time')
+    
+    # Collect plotting tasks
+    tasks = []
+    for file, path in filedirs.items():
+        if file.endswith(file_ext) and ((pattern is None) or (pattern.match(file))):
             
             # Randomly create signal plots if requested
             if (p is None) or (random.random() < p):
-                
-                # Read file
-                data = ReadFileType(filedirs[file], file_ext)
-                
-                # If no columns selected, apply filter to all columns except time
-                if cols is None:
-                    cols = list(data.columns)
-                    if 'Time' in cols:
-                        cols.remove('Time')
-                
-                # Create plot
-                fig, axs = plt.subplots(1, len(cols), figsize=(15*len(cols),15))
-                
-                # Plot each column
-                if len(cols) == 1:
-                    col = cols[0]
-                    
-                    if col not in list(data.columns.values):
-                        raise Exception("Column " + col + " not in Signal " + file)
-                    
-                    psd = EMG2PSD(data[col], sampling_rate=sampling_rate)
-                    axs.plot(psd['Frequency'], psd['Power'])
-                    axs.set_ylabel('Power magnitude')
-                    axs.set_xlabel('Frequency')
-                    axs.set_title(col)
-                    
-                else:
-                    for i in range(len(cols)):
-                        col = cols[i]
-                        
-                        if col not in list(data.columns.values):
-                            raise Exception("Column " + col + " not in Signal " + file)
-                        
-                        psd = EMG2PSD(data[col], sampling_rate=sampling_rate)
-                        axs[i].plot(psd['Frequency'], psd['Power'])
-                        axs[i].set_ylabel('Power magnitude')
-                        axs[i].set_xlabel('Frequency')
-                        axs[i].set_title(col)
-                
-                # Set title and save figure
-                fig.suptitle(file + ' Power Spectrum Density')
-                fig.savefig(out_path + file[:-len(file_ext)] + 'jpg')
+                tasks.append((file, path, out_path, sampling_rate, cols, file_ext, cache_dir))
+    
+    # Make plots, one file per worker process, starting no more workers than
+    # there are files
+    _RunTasks(_PlotSpectrumFile, tasks, workers)
     return
 
 #
 # =============================================================================
 #
 
-def PlotCompareSignals(in_path1, in_path2, out_path, sampling_rate, cols=None, expression=None, file_ext='csv'):
+def PlotCompareSignals(in_path1, in_path2, out_path, sampling_rate, cols=None, expression=None, file_ext='csv', cache_psd=False, cache_dir=None, workers=1):
     """
     Generate plots of the PSDs comparing different processing stages.
 
@@ -164,6 +516,16 @@ def PlotCompareSignals(in_path1, in_path2, out_path, sampling_rate, cols=None, e
         expression. The default is None.
     file_ext : str, optional
         File extension for files to read. Only reads files with this extension. The default is 'csv'.
+    cache_psd : bool, optional
+        If True, the PSDs of each Signal file are saved as a '.psd.npz' file in cache_dir, and reused by
+        later calls to PlotSpectrum or PlotCompareSignals until the Signal file is modified. The input
+        folders are never written to. The default is False.
+    cache_dir : str, optional
+        Directory to keep the cached PSDs in if cache_psd is True. The default is None, in which case a
+        'psd_cache' folder in out_path is used.
+    workers : int, optional
+        Number of worker processes to draw plots in, one file per process. The default is 1, in which case
+        plots are drawn in the calling process. If None, one process per CPU is used.
 
     Raises
     ------
@@ -189,9 +551,10 @@ def PlotCompareSignals(in_path1, in_path2, out_path, sampling_rate, cols=None, e
 
     """
     
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -199,67 +562,36 @@ def PlotCompareSignals(in_path1, in_path2, out_path, sampling_rate, cols=None, e
     if not os.path.isabs(out_path):
         out_path = os.path.abspath(out_path)
     
+    # Keep cached PSDs out of the input folders
+    if not cache_psd:
+        cache_dir = None
+    elif cache_dir is None:
+        cache_dir = os.path.join(out_path, 'psd_cache')
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    
     # Get dictionary of file locations
-    filedirs1 = ConvertMapFiles(in_path1, file_ext=file_ext, expression=expression)
-    filedirs2 = ConvertMapFiles(in_path2, file_ext=file_ext, expression=expression)
+    filedirs1 = ConvertMapFiles(in_path1, file_ext=file_ext, expression=pattern)
+    filedirs2 = ConvertMapFiles(in_path2, file_ext=file_ext, expression=pattern)
     
     if set(filedirs1.keys()) != set(filedirs2.keys()):
         raise Exception("File mismatch between provided directories")
     
-    # Make plots
-    for file in tqdm(filedirs1):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            
-            # Read file
-            data1 = ReadFileType(filedirs1[file], file_ext)
-            data2 = ReadFileType(filedirs2[file], file_ext)
-            
-            # If no columns selected, apply filter to all columns except time
-            if cols is None:
-                cols = list(data1.columns)
-                if 'Time' in cols:
-                    cols.remove('Time')
-            
-            # Create plot
-            fig, axs = plt.subplots(2, len(cols), figsize=(15*len(cols),30))
-            
-            if len(cols) == 1:
-                col = cols[0]
-                
-                if col not in list(data1.columns.values) or col not in list(data2.columns.values):
-                    raise Exception("Column " + col + " not in Signal " + file)
-                
-                psd1 = EMG2PSD(data1[col], sampling_rate=sampling_rate)
-                axs[0].plot(psd1['Frequency'], psd1['Power'])
-                axs[0].set_ylabel('Power magnitude')
-                axs[0].set_title(col)
-                
-                psd2 = EMG2PSD(data2[col], sampling_rate=sampling_rate)
-                axs[1].plot(psd2['Frequency'], psd2['Power'])
-                axs[1].set_ylabel('Power magnitude')
-                axs[1].set_xlabel('Frequency')
-                
-            else:
-                # Plot each column
-                for i in range(len(cols)):
-                    col = cols[i]
-                    
-                    if col not in list(data1.columns.values) or col not in list(data2.columns.values):
-                        raise Exception("Column " + col + " not in Signal " + file)
-                    
-                    psd1 = EMG2PSD(data1[col], sampling_rate=sampling_rate)
-                    axs[0,i].plot(psd1['Frequency'], psd1['Power'])
-                    axs[0,i].set_ylabel('Power magnitude')
-                    axs[0,i].set_title(col)
-                    
-                    psd2 = EMG2PSD(data2[col], sampling_rate=sampling_rate)
-                    axs[1,i].plot(psd2['Frequency'], psd2['Power'])
-                    axs[1,i].set_ylabel('Power magnitude')
-                    axs[1,i].set_xlabel('Frequency')
-            
-            # Set title and save figure
-            fig.suptitle(file + ' Power Spectrum Density')
-            fig.savefig(out_path + file[:-len(file_ext)] + 'jpg')
+    # If no columns selected, apply filter to all columns except time
+    if (cols is None) and (len(filedirs1) > 0):
+        cols = ReadFileColumns(next(iter(filedirs1.values())), file_ext)
+        if 'Time' in cols:
+            cols.remove('Time')
+    
+    # Collect plotting tasks
+    tasks = []
+    for file, path1 in filedirs1.items():
+        if file.endswith(file_ext) and ((pattern is None) or (pattern.match(file))):
+            tasks.append((file, path1, filedirs2[file], out_path, sampling_rate, cols, file_ext, cache_dir))
+    
+    # Make plots, one file per worker process, starting no more workers than
+    # there are files
+    _RunTasks(_PlotCompareFile, tasks, workers)
     
     return
 
@@ -360,55 +692,70 @@ def GenPlotDash(in_paths, col, units, names, expression=None, file_ext='csv', au
     legnames = names.copy()
     legnames.reverse()
     
+    # Read the time and column of a Signal as arrays, keeping recently read
+    # Signals so that switching between them does not parse them again
+    @functools.lru_cache(maxsize=128)
+    def ReadSignal(filename, file_loc):
+        # Exception for column input
+        if col not in ReadFileColumns(file_loc, file_ext):
+            raise Exception("Column " + col + " not in Signal " + filename)
+        
+        sigDF = ReadFileType(file_loc, file_ext, cols=['Time', col])
+        return sigDF['Time'].to_numpy(), sigDF[col].to_numpy()
+    
     # =================
     # Server definition
     # =================
     def server(input, output, session):
+        # Create the figure once per session, with one line per filter, and
+        # only update the lines' data when the selection changes
+        fig, ax = plt.subplots()
+        lines = [ax.plot([], [], alpha=0.5)[0] for _ in names]
+        
         @render.plot
         def plt_signal():
             filename = input.file_type()
             column = input.sig_type()
             
             # Plot data
-            fig, ax = plt.subplots()
             if column == 'All':
                 # Read/plot each file
-                for file_loc in reversed(list(df.loc[filename])[1:]):
-                    sigDF = ReadFileType(file_loc, file_ext)
-                    
-                    # Exception for column input
-                    if col not in list(sigDF.columns.values):
-                        raise Exception("Column " + col + " not in Signal " + filename)
+                for k, file_loc in enumerate(reversed(list(df.loc[filename])[1:])):
+                    time, vals = ReadSignal(filename, file_loc)
                     
                     # Set line width
-                    if len(sigDF.index) > 10000:
+                    if len(time) > 10000:
                         lw = 0.5
                     else:
                         lw = 1
                     
-                    ax.plot(sigDF['Time'], sigDF[col], alpha=0.5, linewidth=lw)
+                    lines[k].set_data(time, vals)
+                    lines[k].set(color=colours[k % len(colours)], linewidth=lw, visible=True)
                 # Set legend for multiple plots
                 ax.legend(legnames)
             else:
                 # Read/plot single file
                 file_location = df.loc[filename][column]
-                sigDF = ReadFileType(file_location, file_ext)
-                
-                # Exception for column input
-                if col not in list(sigDF.columns.values):
-                    raise Exception("Column " + col + " not in Signal " + filename)
+                time, vals = ReadSignal(filename, file_location)
                 
                 # Set line width
-                if len(sigDF.index) > 10000:
+                if len(time) > 10000:
                     lw = 0.5
                 else:
                     lw = 1
                 
                 # Get colour data
                 i = (names.index(column) + 1) % len(colours)
-                # Plot file
-                ax.plot(sigDF['Time'], sigDF[col], color=colours[len(names) - i], alpha=0.5, linewidth=lw)
-                
+                # Plot file, hiding the other lines
+                lines[0].set_data(time, vals)
+                lines[0].set(color=colours[len(names) - i], linewidth=lw, visible=True)
+                for line in lines[1:]:
+                    line.set_visible(False)
+                if ax.get_legend() is not None:
+                    ax.get_legend().remove()
+            
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
             
             ax.set_ylabel('Voltage (mV)')
             ax.set_xlabel('Time (s)')
@@ -2,9 +2,12 @@ import scipy
 import pandas as pd
 import numpy as np
 import os
+import shutil
 import re
+import functools
 from tqdm import tqdm
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 from .FileAccess import *
 
@@ -20,20 +23,54 @@ A collection of functions for filtering Signals.
 # =============================================================================
 #
 
-def EMG2PSD(Sig_vals, sampling_rate=1000, normalize=True):
+# Hann windows used by the PSD, keyed by their (length, dtype)
+_WINDOWS = {}
+
+def _HannWindow(nperseg, dtype):
     """
-    Creates a PSD graph of a Signal. Uses the Welch method, meaning it can be
-    used as a Long Term Average Spectrum (LTAS).
+    Get a periodic Hann window, reusing it for every PSD of the same length.
+
+    Parameters
+    ----------
+    nperseg : int
+        Length of the window.
+    dtype : dtype
+        Data type of the window.
+
+    Returns
+    -------
+    window : ndarray
+        The Hann window. Shared between calls, so must not be modified.
+
+    """
+    
+    key = (nperseg, np.dtype(dtype))
+    if key not in _WINDOWS:
+        _WINDOWS[key] = scipy.signal.get_window('hann', nperseg).astype(dtype)
+    return _WINDOWS[key]
+
+#
+# =============================================================================
+#
+
+def _EMG2PSDArrays(Sig_vals, sampling_rate=1000, normalize=True, window_len=None):
+    """
+    Calculates the PSD of a Signal as arrays, without building a DataFrame.
+    Used by EMG2PSD, and by functions that only need the raw values.
 
     Parameters
     ----------
-    Sig_vals : float list
-        A list of float values. A column of a Signal.
+    Sig_vals : ndarray
+        An array of float values, with one column per Signal column if 2D.
     sampling_rate : float
         Sampling rate of the Signal.
     normalize : bool, optional
         If True, will normalize the result. If False, will not. The default is
         True.
+    window_len : int, optional
+        Number of samples to size the Welch window for. Signals given the same
+        window_len share the same frequencies. The default is None, in which
+        case the length of Sig_vals is used.
 
     Raises
     ------
@@ -42,19 +79,22 @@ def EMG2PSD(Sig_vals, sampling_rate=1000, normalize=True):
 
     Returns
     -------
-    psd : DataFrame
-        A DataFrame containing a 'Frequency' and 'Power' column. The Power
-        column indicates the intensity of each frequency in the Signal
-        provided. Results will be normalized if 'normalize' is set to True.
-    
+    frequency : ndarray
+        Frequencies of the PSD, starting at the minimum frequency resolvable
+        for the length of the Signal.
+    power : ndarray
+        Power at each frequency, with one column per Signal column if
+        Sig_vals is 2D.
+    start : int
+        Position of the first returned frequency in the full Welch output.
+
     """
     
     if sampling_rate <= 0:
         raise Exception("Sampling rate must be greater or equal to 0")
     
     # Initial parameters
-    Sig_vals = Sig_vals - np.mean(Sig_vals)
-    N = len(Sig_vals)
+    N = len(Sig_vals) if window_len is None else window_len
     
     # Calculate minimum frequency given sampling rate
     min_frequency = (2 * sampling_rate) / (N / 2)
@@ -63,27 +103,92 @@ def EMG2PSD(Sig_vals, sampling_rate=1000, normalize=True):
     nperseg = int((2 / min_frequency) * sampling_rate)
     nfft = nperseg * 2
     
-    # Apply welch method with hanning window
-    frequency, power = scipy.signal.welch(
-        Sig_vals,
-        fs=sampling_rate,
-        scaling='density',
-        detrend=False,
-        nfft=nfft,
-        average='mean',
-        nperseg=nperseg,
-        window='hann'
-    )
+    # Apply welch method with hanning window, taking the one-sided FFT of
+    # every segment (and column) in a single rfft call. The mean is removed
+    # while the segments are windowed, so the Signal itself is never copied.
+    # The FFT uses as many threads as the surrounding scipy.fft.set_workers
+    # context allows
+    step = nperseg - nperseg // 2
+    segments = np.lib.stride_tricks.sliding_window_view(Sig_vals, nperseg, axis=0)[::step]
+    window = _HannWindow(nperseg, np.result_type(Sig_vals, np.float32))
+    windowed = np.subtract(segments, np.expand_dims(np.mean(Sig_vals, axis=0), -1), dtype=window.dtype)
+    windowed *= window
+    spectrum = scipy.fft.rfft(windowed, n=nfft, axis=-1)
+    power = np.mean(spectrum.real**2 + spectrum.imag**2, axis=0)
+    power = np.moveaxis(power, -1, 0) / (sampling_rate * np.dot(window, window))
+    frequency = scipy.fft.rfftfreq(nfft, 1 / sampling_rate)
+    
+    # Double every bin but DC (and Nyquist) to keep the one-sided density
+    if nfft % 2 == 0:
+        power[1:-1] *= 2
+    else:
+        power[1:] *= 2
     
     # Normalize if set to true
     if normalize is True:
-        power /= np.max(power)
-        
+        power /= np.max(power, axis=0)
+    
+    # Filter out frequencies below the minimum
+    start = int(np.searchsorted(frequency, min_frequency))
+    return frequency[start:], power[start:], start
+
+#
+# =============================================================================
+#
+
+def EMG2PSD(Sig_vals, sampling_rate=1000, normalize=True):
+    """
+    Creates a PSD graph of a Signal. Uses the Welch method, meaning it can be
+    used as a Long Term Average Spectrum (LTAS).
+
+    Parameters
+    ----------
+    Sig_vals : float list, ndarray, DataFrame
+        A list of float values. A column of a Signal. If a DataFrame or 2D
+        array of several Signal columns is provided, the PSDs of all columns
+        are calculated together in a single Welch call.
+    sampling_rate : float
+        Sampling rate of the Signal.
+    normalize : bool, optional
+        If True, will normalize the result. If False, will not. The default is
+        True.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if the sampling rate is less or equal to 0
+
+    Returns
+    -------
+    psd : DataFrame
+        A DataFrame containing a 'Frequency' and 'Power' column. The Power
+        column indicates the intensity of each frequency in the Signal
+        provided. Results will be normalized if 'normalize' is set to True.
+        If Sig_vals is a DataFrame, the 'Power' column is replaced by one
+        column of the same name for each column of Sig_vals. If it is a 2D
+        array, the columns are named by their position instead.
+    
+    """
+    
+    # Keep column names when calculating several PSDs at once
+    col_names = None
+    if isinstance(Sig_vals, pd.DataFrame):
+        col_names = list(Sig_vals.columns)
+        Sig_vals = Sig_vals.to_numpy()
+    
+    # Spread the FFT over every CPU
+    with scipy.fft.set_workers(-1):
+        frequency, power, start = _EMG2PSDArrays(np.asarray(Sig_vals), sampling_rate, normalize)
+    index = pd.RangeIndex(start, start + len(frequency))
+    if col_names is None and power.ndim > 1:
+        col_names = list(range(power.shape[1]))
+    
     # Create dataframe of results
-    psd = pd.DataFrame({'Frequency': frequency, 'Power': power})
-    # Filter given 
-    psd = psd.loc[np.logical_and(psd['Frequency'] >= min_frequency,
-                                   psd['Frequency'] <= np.inf)]
+    if col_names is None:
+        psd = pd.DataFrame({'Frequency': frequency, 'Power': power}, index=index)
+    else:
+        psd = pd.DataFrame(power, columns=col_names, index=index)
+        psd.insert(0, 'Frequency', frequency)
     
     return psd
 
@@ -91,7 +196,102 @@ def EMG2PSD(Sig_vals, sampling_rate=1000, normalize=True):
 # =============================================================================
 #
 
-def ApplyNotchFilters(Signal, col, sampling_rate, notch_vals):
+@functools.lru_cache(maxsize=32)
+def _NotchSOS(sampling_rate, notch_vals):
+    """
+    Design a cascade of notch filters, reusing it for every later Signal
+    filtered with the same parameters.
+
+    Parameters
+    ----------
+    sampling_rate : float
+        Sampling rate of the Signal.
+    notch_vals : tuple
+        A tuple of (Hz, Q) tuples corresponding to the notch filters being
+        applied.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if the sampling rate is less or equal to 0.
+    Exception
+        An exception is raised if a Hz value in notch_vals is greater than
+        sampling_rate/2 or less than 0
+
+    Returns
+    -------
+    sos : ndarray
+        The notch filters as second-order sections, one row per filter.
+        Shared between calls, so must not be modified.
+
+    """
+    
+    if sampling_rate <= 0:
+        raise Exception("Sampling rate must be greater or equal to 0")
+
+    nyq_freq = sampling_rate / 2
+    
+    # Stack every notch filter as one second-order section of a single
+    # cascade, so the values are filtered in one pass
+    sos = []
+    for (Hz, Q) in notch_vals:
+        if Hz > nyq_freq or Hz < 0:
+            raise Exception("Notch filter frequency must be between 0 and " + str(nyq_freq) + " (sampling_rate/2)")
+        
+        # Use scipy notch filter using normalized frequency
+        b, a = scipy.signal.iirnotch(Hz / nyq_freq, Q)
+        sos.append(np.concatenate([b, a]))
+    
+    return np.array(sos).reshape(-1, 6)
+
+#
+# =============================================================================
+#
+
+def _NotchFilter(vals, sampling_rate, notch_vals, zero_phase=False):
+    """
+    Apply a list of notch filters to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    sampling_rate : float
+        Sampling rate of the Signal.
+    notch_vals : list
+        A list of (Hz, Q) tuples corresponding to the notch filters being
+        applied.
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards with sosfiltfilt, so
+        the result has no phase shift. The default is False.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if the sampling rate is less or equal to 0.
+    Exception
+        An exception is raised if a Hz value in notch_vals is greater than
+        sampling_rate/2 or less than 0
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
+    
+    sos = _NotchSOS(sampling_rate, tuple(tuple(notch) for notch in notch_vals))
+    if len(sos) == 0:
+        return vals
+    if zero_phase:
+        return scipy.signal.sosfiltfilt(sos.astype(vals.dtype, copy=False), vals, axis=0)
+    return scipy.signal.sosfilt(sos.astype(vals.dtype, copy=False), vals, axis=0)
+
+#
+# =============================================================================
+#
+
+def ApplyNotchFilters(Signal, col, sampling_rate, notch_vals, zero_phase=False):
     """
     Apply a list of notch filters for given frequencies and Q-factors to a
     column of the provided data.
@@ -110,6 +310,9 @@ def ApplyNotchFilters(Signal, col, sampling_rate, notch_vals):
         applied. Hz is the frequency to apply the filter to, and Q is the
         Q-score (an intensity score where a higher number means a less extreme
         filter).
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards, so the filtered
+        Signal has no phase shift, at twice the cost. The default is False.
 
     Raises
     ------
@@ -128,72 +331,202 @@ def ApplyNotchFilters(Signal, col, sampling_rate, notch_vals):
 
     """
 
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal")
     
-    if sampling_rate <= 0:
-        raise Exception("Sampling rate must be greater or equal to 0")
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _NotchFilter(Signal[col].to_numpy(dtype=np.float64), sampling_rate, notch_vals, zero_phase)
+    return Signal
 
-    def ApplyNotchFilter(Signal, col, sampling_rate, notch):
-        """
-        Apply a notch filter to a signal
-
-        Parameters
-        ----------
-        Signal : DataFrame
-            A Pandas DataFrame containing a 'Time' column, and additional
-            columns for signal data.
-        col : str
-            Column of the Signal to apply the filter to.
-        sampling_rate : float
-            Sampling rate of the Signal.
-        notch : (int, int) tuple
-            Notch filter data. Should be a (Hz, Q) tuple where Hz is the
-            frequency to apply the filter to, and Q. is the Q-score (an
-            intensity score where a higher number means a less extreme filter).
-
-        Raises
-        ------
-        Exception
-            An exception is raised if the Hz value in notch is greater than
-            sampling_rate/2 or less than 0.
-
-        Returns
-        -------
-        Signal_col : Series
-            A Pandas Series of the provided column with the notch filter applied
-
-        """
-        
-        Signal = Signal.copy()
-        
-        (Hz, Q) = notch
-        
-        if Hz > sampling_rate / 2 or Hz < 0:
-            raise Exception("Notch filter frequency must be between 0 and " + str(sampling_rate / 2) + " (sampling_rate/2)")
+#
+# =============================================================================
+#
+
+def _SOSFilter(vals, sos, zi=None):
+    """
+    Apply a filter given as second-order sections to the values of a Signal,
+    carrying the state of the filter from one call to the next, so that a
+    Signal can be filtered in consecutive chunks.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a chunk of a Signal. If 2D, each column is filtered
+        separately.
+    sos : ndarray
+        The filter as second-order sections.
+    zi : ndarray, optional
+        State of the filter at the end of the previous chunk. The default is
+        None, in which case the filter starts at rest.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+    zf : ndarray
+        State of the filter at the end of the chunk.
+
+    """
+    
+    if zi is None:
+        zi = np.zeros((len(sos), 2) + vals.shape[1:], dtype=vals.dtype)
+    if len(sos) == 0:
+        return vals, zi
+    return scipy.signal.sosfilt(sos.astype(vals.dtype, copy=False), vals, axis=0, zi=zi)
+
+#
+# =============================================================================
+#
+
+def _FilterFile(task):
+    """
+    Read a Signal file, apply a filter to its columns and write the result.
+    Defined at module level so that it can be sent to worker processes.
+
+    Parameters
+    ----------
+    task : tuple
+        A (path, out_file, file_ext, cols, Filter, args, dtype, chunksize)
+        tuple, where Filter is called as Filter(vals, *args) on a
+        2D array of type dtype with one column per column in cols. If
+        chunksize is not None, the CSV file is instead filtered chunksize rows
+        at a time, with Filter called as Filter(vals, *args, zi=zi) and
+        returning the filtered values and the state zi for the next chunk.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if a column in cols is not in the data file.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    (path, out_file, file_ext, cols, Filter, args, dtype, chunksize) = task
+    
+    if chunksize is not None:
+        # Stream the file, so only one chunk is held in memory at a time
+        zi = None
+        for n, data in enumerate(pd.read_csv(path, chunksize=chunksize)):
+            if n == 0:
+                for col in cols:
+                    if col not in data.columns:
+                        raise Exception("Column " + col + " not in Signal")
+            
+            vals, zi = Filter(data[cols].to_numpy(dtype=dtype), *args, zi=zi)
+            data[cols] = vals
+            data.to_csv(out_file, mode='w' if n == 0 else 'a', header=(n == 0), index=False)
+        return
+    
+    # Read file
+    data = ReadFileType(path, file_ext)
+    
+    for col in cols:
+        if col not in data.columns:
+            raise Exception("Column " + col + " not in Signal")
+    
+    # Filter every column at once as a single array, and write the results
+    # back in one assignment
+    data[cols] = Filter(data[cols].to_numpy(dtype=dtype), *args)
+    
+    # Write data
+    WriteFileType(data, out_file, file_ext)
+
+#
+# =============================================================================
+#
+
+def _FilterFiles(in_path, out_path, filedirs, cols, pattern, exp_copy, file_ext, Filter, args, dtype=np.float64, chunksize=None):
+    """
+    Apply a filter to every matching Signal file, with the files spread over
+    worker processes. Used by the batch filter functions.
+
+    Parameters
+    ----------
+    in_path : str
+        Filepath to a directory to read Signal files.
+    out_path : str
+        Filepath to an output directory.
+    filedirs : dict
+        Dictionary of file names and locations in in_path.
+    cols : list
+        List of columns of the Signals to apply the filter to. If None, the
+        filter is applied to every column except for 'Time', as found in the
+        first matching file.
+    pattern : re.Pattern
+        A compiled regular expression, or None to filter every file.
+    exp_copy : bool
+        If True, copies files that don't match the regular expression to
+        out_path without filtering them.
+    file_ext : str
+        File extension for files to read.
+    Filter : function
+        Filter to apply, called as Filter(vals, *args) on a 2D array with one
+        column per filtered column.
+    args : tuple
+        Additional arguments of Filter.
+    dtype : data-type, optional
+        Floating point type the filtered columns are processed in. The default
+        is np.float64.
+    chunksize : int, optional
+        Number of rows of CSV files to filter at a time, with Filter carrying
+        its state between chunks. The default is None, in which case whole
+        files are filtered.
+
+    Returns
+    -------
+    None.
+
+    """
+    
+    # Collect the files to filter, making each output folder only once
+    in_len = len(in_path)
+    out_folders = set()
+    tasks = []
+    for file, path in filedirs.items():
+        if not file.endswith(file_ext):
+            continue
         
-        # Normalize filtering frequency
-        nyq_freq = sampling_rate / 2
-        norm_Hz = Hz / nyq_freq
+        matched = (pattern is None) or (pattern.match(file) is not None)
+        if not matched and not exp_copy:
+            continue
         
-        # Use scipy notch filter using normalized frequency
-        b, a = scipy.signal.iirnotch(norm_Hz, Q)
-        Signal_col = scipy.signal.lfilter(b, a, Signal[col])
+        # Construct out path
+        out_file = out_path + path[in_len:]
+        out_folder = out_file[:len(out_file) - len(file)]
+        if out_folder not in out_folders:
+            os.makedirs(out_folder, exist_ok=True)
+            out_folders.add(out_folder)
         
-        return Signal_col
+        if matched:
+            tasks.append([path, out_file, file_ext, cols, Filter, args, dtype, chunksize])
+        else:
+            # Copy the file even if it doesn't match if exp_copy is true
+            shutil.copyfile(path, out_file)
     
-    Signal = Signal.copy()
+    # If no columns selected, apply filter to all columns except time
+    if cols is None and len(tasks) > 0:
+        cols = ReadFileColumns(tasks[0][0], file_ext)
+        if 'Time' in cols:
+            cols.remove('Time')
+        for task in tasks:
+            task[3] = cols
     
-    # Applies ApplyNotchFilter for every notch_val tuple
-    for i in range(len(notch_vals)):
-        Signal[col] = ApplyNotchFilter(Signal, col, sampling_rate, notch_vals[i])
-    return Signal
+    # Apply transformations, one file per worker process, starting no more
+    # workers than there are files
+    if len(tasks) == 0:
+        return
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(tasks))) as ex:
+        list(tqdm(ex.map(_FilterFile, tasks), total=len(tasks)))
 
 #
 # =============================================================================
 #
 
-def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expression=None, exp_copy=False, file_ext='csv'):
+def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expression=None, exp_copy=False, file_ext='csv', dtype=np.float64, chunksize=None, zero_phase=False):
     """
     Apply notch filters to all Signals in a folder. Writes filtered Signals to
     an output folder, and generates a file structure matching the input folder.
@@ -225,6 +558,20 @@ def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expre
     file_ext : TYPE, optional
         File extension for files to read. Only reads files with this extension.
         The default is 'csv'.
+    dtype : data-type, optional
+        Floating point type the filtered columns are processed and written in.
+        np.float32 halves the memory and bandwidth used while filtering, at
+        the cost of precision. The default is np.float64.
+    chunksize : int, optional
+        Number of rows of CSV files to read, filter and write at a time, so
+        that long recordings are never fully loaded in memory. The state of
+        the filter is carried between chunks, so the results are the same as
+        filtering whole files. Only supported for CSV files. The default is
+        None, in which case whole files are filtered.
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards, so the filtered
+        Signals have no phase shift, at twice the cost. Cannot be used with
+        chunksize. The default is False.
 
     Raises
     ------
@@ -244,6 +591,9 @@ def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expre
     Exception
         Raises an exception if expression is not None or a valid regular
         expression.
+    Exception
+        Raises an exception if chunksize is used with a file_ext other than
+        'csv'.
 
     Returns
     -------
@@ -251,12 +601,22 @@ def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expre
 
     """
     
+    # Compile the regular expression once for every file
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
+    if zero_phase and chunksize is not None:
+        raise Exception("zero_phase filtering cannot be used with chunksize")
+    
+    # Chunks are appended to the output as CSV text, so only CSV files can be
+    # streamed
+    if chunksize is not None and file_ext != 'csv':
+        raise Exception("chunksize can only be used with CSV files")
+    
     # Convert out_path to absolute
     if not os.path.isabs(out_path):
         out_path = os.path.abspath(out_path)
@@ -265,42 +625,20 @@ def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expre
     if exp_copy:
         filedirs = MapFiles(in_path, file_ext=file_ext)
     else:
-        filedirs = MapFiles(in_path, file_ext=file_ext, expression=expression)
+        filedirs = MapFiles(in_path, file_ext=file_ext, expression=pattern)
         if len(filedirs) == 0:
             warnings.warn("Warning: The regular expression " + expression + " did not match with any files.")
         
     
+    # Select the filter, which streamed files apply with its state carried
+    # between chunks
+    if chunksize is None:
+        Filter, args = _NotchFilter, (sampling_rate, notch, zero_phase)
+    else:
+        Filter, args = _SOSFilter, (_NotchSOS(sampling_rate, tuple(tuple(n) for n in notch)),)
+    
     # Apply transformations
-    for file in tqdm(filedirs):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            # Read file
-            data = ReadFileType(filedirs[file], file_ext)
-            
-            # If no columns selected, apply filter to all columns except time
-            if cols is None:
-                cols = list(data.columns)
-                if 'Time' in cols:
-                    cols.remove('Time')
-            
-            # Apply filter to columns
-            for col in cols:
-                data = ApplyNotchFilters(data, col, sampling_rate, notch)
-            
-            # Construct out path
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            
-            # Make folders and write data
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
-            
-        elif (file[-len(file_ext):] == file_ext) and exp_copy:
-            # Copy the file even if it doesn't match if exp_copy is true
-            data = ReadFileType(filedirs[file], file_ext)
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
+    _FilterFiles(in_path, out_path, filedirs, cols, pattern, exp_copy, file_ext, Filter, args, dtype, chunksize)
     
     return
 
@@ -308,7 +646,97 @@ def NotchFilterSignals(in_path, out_path, sampling_rate, notch, cols=None, expre
 # =============================================================================
 #
 
-def ApplyBandpassFilter(Signal, col, sampling_rate, low, high):
+@functools.lru_cache(maxsize=32)
+def _BandpassSOS(sampling_rate, low, high):
+    """
+    Design a bandpass filter, reusing it for every later Signal filtered with
+    the same parameters.
+
+    Parameters
+    ----------
+    sampling_rate : float
+        Sampling rate of the Signal.
+    low : float
+        Lower frequency limit of the bandpass filter.
+    high : float
+        Upper frequency limit of the bandpass filter.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if the sampling rate is less or equal to 0.
+    Exception
+        An exception is raised if high is not higher than low.
+
+    Returns
+    -------
+    sos : ndarray
+        The bandpass filter as second-order sections. Shared between calls,
+        so must not be modified.
+
+    """
+    
+    if sampling_rate <= 0:
+        raise Exception("Sampling rate must be greater or equal to 0.")
+    
+    if high > sampling_rate/2 or low > sampling_rate/2:
+        raise Exception("'high' and 'low' cannot be greater than 1/2 the sampling rate.")
+    
+    if high <= low:
+        raise Exception("'high' must be higher than 'low'.")
+    
+    # Here, the "5" is the order of the butterworth filter
+    # (how quickly the signal is cut off). The filter is applied as cascaded
+    # second-order sections, which is faster and more stable than the single
+    # high-order transfer function
+    return scipy.signal.butter(5, [low, high], fs=sampling_rate, btype='band', output='sos')
+
+#
+# =============================================================================
+#
+
+def _BandpassFilter(vals, sampling_rate, low, high, zero_phase=False):
+    """
+    Apply a bandpass filter to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    sampling_rate : float
+        Sampling rate of the Signal.
+    low : float
+        Lower frequency limit of the bandpass filter.
+    high : float
+        Upper frequency limit of the bandpass filter.
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards with sosfiltfilt, so
+        the result has no phase shift. The default is False.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if the sampling rate is less or equal to 0.
+    Exception
+        An exception is raised if high is not higher than low.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
+    
+    sos = _BandpassSOS(sampling_rate, low, high)
+    if zero_phase:
+        return scipy.signal.sosfiltfilt(sos.astype(vals.dtype, copy=False), vals, axis=0)
+    return scipy.signal.sosfilt(sos.astype(vals.dtype, copy=False), vals, axis=0)
+
+#
+# =============================================================================
+#
+
+def ApplyBandpassFilter(Signal, col, sampling_rate, low, high, zero_phase=False):
     """
     Apply a bandpass filter to a Signal for a given lower and upper limit.
 
@@ -325,6 +753,9 @@ def ApplyBandpassFilter(Signal, col, sampling_rate, low, high):
         Lower frequency limit of the bandpass filter.
     high : float
         Upper frequency limit of the bandpass filter.
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards, so the filtered
+        Signal has no phase shift, at twice the cost. The default is False.
 
     Raises
     ------
@@ -342,31 +773,19 @@ def ApplyBandpassFilter(Signal, col, sampling_rate, low, high):
 
     """
     
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal.")
     
-    if sampling_rate <= 0:
-        raise Exception("Sampling rate must be greater or equal to 0.")
-    
-    if high > sampling_rate/2 or low > sampling_rate/2:
-        raise Exception("'high' and 'low' cannot be greater than 1/2 the sampling rate.")
-    
-    if high <= low:
-        raise Exception("'high' must be higher than 'low'.")
-    
-    
-    Signal = Signal.copy()
-    # Here, the "5" is the order of the butterworth filter
-    # (how quickly the signal is cut off)
-    b, a = scipy.signal.butter(5, [low, high], fs=sampling_rate, btype='band')
-    Signal[col] = scipy.signal.lfilter(b, a, Signal[col])
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _BandpassFilter(Signal[col].to_numpy(dtype=np.float64), sampling_rate, low, high, zero_phase)
     return Signal
 
 #
 # =============================================================================
 #
 
-def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, cols=None, expression=None, exp_copy=False, file_ext='csv'):
+def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, cols=None, expression=None, exp_copy=False, file_ext='csv', dtype=np.float64, chunksize=None, zero_phase=False):
     """
     Apply bandpass filters to all Signals in a folder. Writes filtered Signals
     to an output folder, and generates a file structure
@@ -398,6 +817,20 @@ def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, co
     file_ext : str, optional
         File extension for files to read. Only reads files with this extension.
         The default is 'csv'.
+    dtype : data-type, optional
+        Floating point type the filtered columns are processed and written in.
+        np.float32 halves the memory and bandwidth used while filtering, at
+        the cost of precision. The default is np.float64.
+    chunksize : int, optional
+        Number of rows of CSV files to read, filter and write at a time, so
+        that long recordings are never fully loaded in memory. The state of
+        the filter is carried between chunks, so the results are the same as
+        filtering whole files. Only supported for CSV files. The default is
+        None, in which case whole files are filtered.
+    zero_phase : bool, optional
+        If True, the filter is run forwards and backwards, so the filtered
+        Signals have no phase shift, at twice the cost. Cannot be used with
+        chunksize. The default is False.
     
     Raises
     ------
@@ -416,6 +849,9 @@ def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, co
     Exception
         Raises an exception if expression is not None or a valid regular
         expression.
+    Exception
+        Raises an exception if chunksize is used with a file_ext other than
+        'csv'.
     
     Returns
     -------
@@ -423,12 +859,22 @@ def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, co
 
     """
     
+    # Compile the regular expression once for every file
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
+    if zero_phase and chunksize is not None:
+        raise Exception("zero_phase filtering cannot be used with chunksize")
+    
+    # Chunks are appended to the output as CSV text, so only CSV files can be
+    # streamed
+    if chunksize is not None and file_ext != 'csv':
+        raise Exception("chunksize can only be used with CSV files")
+    
     # Convert out_path to absolute
     if not os.path.isabs(out_path):
         out_path = os.path.abspath(out_path)
@@ -437,43 +883,20 @@ def BandpassFilterSignals(in_path, out_path, sampling_rate, low=20, high=450, co
     if exp_copy:
         filedirs = MapFiles(in_path, file_ext=file_ext)
     else:
-        filedirs = MapFiles(in_path, file_ext=file_ext, expression=expression)
+        filedirs = MapFiles(in_path, file_ext=file_ext, expression=pattern)
         if len(filedirs) == 0:
             warnings.warn("Warning: The regular expression " + expression + " did not match with any files.")
     
+    # Select the filter, which streamed files apply with its state carried
+    # between chunks
+    if chunksize is None:
+        Filter, args = _BandpassFilter, (sampling_rate, low, high, zero_phase)
+    else:
+        Filter, args = _SOSFilter, (_BandpassSOS(sampling_rate, low, high),)
+    
     # Apply transformations
-    for file in tqdm(filedirs):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            
-            # Read file
-            data = ReadFileType(filedirs[file], file_ext)
-            
-            # If no columns selected, apply filter to all columns except time
-            if cols is None:
-                cols = list(data.columns)
-                if 'Time' in cols:
-                    cols.remove('Time')
-              
-            # Apply filter to columns
-            for col in cols:
-                data = ApplyBandpassFilter(data, col, sampling_rate, low, high)
-            
-            # Construct out path
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            
-            # Make folders and write data
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
-            
-        elif (file[-len(file_ext):] == file_ext) and exp_copy:
-            # Copy the file even if it doesn't match if exp_copy is true
-            data = ReadFileType(filedirs[file], file_ext)
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
-            
+    _FilterFiles(in_path, out_path, filedirs, cols, pattern, exp_copy, file_ext, Filter, args, dtype, chunksize)
+    
     return
 
 #
@@ -504,17 +927,139 @@ def ApplyFWR(Signal, col):
 
     """
     
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal")
     
-    Signal = Signal.copy()
-    Signal[col] = np.abs(Signal[col])
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = np.abs(Signal[col].to_numpy(dtype=np.float64))
     return Signal
 
 #
 # =============================================================================
 #
 
+def _ConvolveSame(vals, window):
+    """
+    Convolve a Signal with a smoothing window, returning the same values as
+    np.convolve(vals, window, 'same'). Windows of 64 samples or more use
+    overlap-add FFT convolution, which is faster than direct convolution for
+    long windows.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is convolved separately.
+    window : ndarray
+        Smoothing window.
+
+    Returns
+    -------
+    ndarray
+        The convolved Signal.
+
+    """
+    
+    window = window.astype(vals.dtype, copy=False)
+    if len(window) < 64 or len(window) > len(vals):
+        # Convolve each column of 2D values separately
+        if vals.ndim > 1:
+            return np.apply_along_axis(np.convolve, 0, vals, window, 'same')
+        return np.convolve(vals, window, 'same')
+    
+    # Convolve every column of 2D values in a single call
+    window = window.reshape((-1,) + (1,) * (vals.ndim - 1))
+    return scipy.signal.oaconvolve(vals, window, mode='same', axes=0)
+
+#
+# =============================================================================
+#
+
+def _RunningMean(vals, window_size):
+    """
+    Calculate the running mean of a Signal, returning the same values as
+    np.convolve(vals, np.ones(window_size) / window_size, 'same'), but from
+    differences of a cumulative sum, so the cost does not depend on the
+    window size.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, the running mean of each column is taken.
+    window_size : int
+        Size of the window of the running mean.
+
+    Returns
+    -------
+    ndarray
+        The running mean of the Signal.
+
+    """
+    
+    N = len(vals)
+    if window_size > N:
+        return np.apply_along_axis(np.convolve, 0, vals, np.ones(window_size, dtype=vals.dtype) / window_size, 'same')
+    
+    # The sums are accumulated in float64 whatever the type of the Signal,
+    # written straight after a leading zero
+    prefix_sum = np.empty((N + 1,) + vals.shape[1:])
+    prefix_sum[0] = 0
+    np.cumsum(vals, axis=0, dtype=np.float64, out=prefix_sum[1:])
+    
+    # Each output sums the window ending at its position in the full
+    # convolution, cut off at the edges of the Signal. The window ends are
+    # taken as slices, and the result is built in a single buffer
+    half = int(window_size - 1) // 2
+    start = int(window_size) - 1 - half
+    means = np.empty_like(prefix_sum[:N])
+    means[:N - half] = prefix_sum[half + 1:]
+    means[N - half:] = prefix_sum[N]
+    means[start:] -= prefix_sum[:N - start]
+    means /= window_size
+    return means.astype(vals.dtype, copy=False)
+
+#
+# =============================================================================
+#
+
+def _BoxcarSmooth(vals, window_size):
+    """
+    Apply a boxcar smoothing filter to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    window_size : int, float
+        Size of the window of the filter.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if window_size is less or equal to 0.
+    Warning
+        A warning is raised if window_size is greater than Signal length.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
+    
+    if window_size > len(vals):
+        warnings.warn("Warning: Selected window size is greater than Signal file.")
+    
+    if window_size <= 0:
+        raise Exception("window_size cannot be 0 or negative")
+    
+    # Take the running mean of the rectified values
+    return _RunningMean(np.abs(vals), window_size)
+
+#
+# =============================================================================
+#
+
 def ApplyBoxcarSmooth(Signal, col, window_size):
     """
     Apply a boxcar smoothing filter to a Signal. Uses a rolling average with a
@@ -546,24 +1091,54 @@ def ApplyBoxcarSmooth(Signal, col, window_size):
 
     """
     
-    if window_size > len(Signal.index):
-        warnings.warn("Warning: Selected window size is greater than Signal file.")
-    
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal")
     
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _BoxcarSmooth(Signal[col].to_numpy(dtype=np.float64), window_size)
+    return Signal
+
+#
+# =============================================================================
+#
+
+def _RMSSmooth(vals, window_size):
+    """
+    Apply an RMS smoothing filter to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    window_size : int, float
+        Size of the window of the filter.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if window_size is less or equal to 0.
+    Warning
+        A warning is raised if window_size is greater than Signal length.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
+    
+    if window_size > len(vals):
+        warnings.warn("Warning: Selected window size is greater than Signal file.")
+    
     if window_size <= 0:
         raise Exception("window_size cannot be 0 or negative")
-        
-    
-    Signal = Signal.copy()
     
-    Signal = ApplyFWR(Signal, col)
-    # Construct kernel
-    window = np.ones(window_size) / float(window_size)
-    # Convolve
-    Signal[col] = np.convolve(Signal[col], window, 'same')
-    return Signal
+    # Take the running mean of the squares and its square root, clipping the
+    # round-off of the cumulative sum that can leave slightly negative means
+    means = _RunningMean(np.square(vals), window_size)
+    np.maximum(means, 0, out=means)
+    return np.sqrt(means, out=means)
 
 #
 # =============================================================================
@@ -600,25 +1175,106 @@ def ApplyRMSSmooth(Signal, col, window_size):
 
     """
     
-    if window_size > len(Signal.index):
-        warnings.warn("Warning: Selected window size is greater than Signal file.")
-    
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal")
     
-    if window_size <= 0:
-        raise Exception("window_size cannot be 0 or negative")
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _RMSSmooth(Signal[col].to_numpy(dtype=np.float64), window_size)
+    return Signal
+
+#
+# =============================================================================
+#
+
+@functools.lru_cache(maxsize=32)
+def _GaussianWindow(n, sigma):
+    """
+    Create a Gaussian kernel, reusing it for every later Signal smoothed with
+    the same parameters.
+
+    Parameters
+    ----------
+    n : int
+        Size of the kernel.
+    sigma : float
+        Standard deviation of the Gaussian.
+
+    Returns
+    -------
+    window : ndarray
+        The Gaussian kernel. Shared between calls, so must not be modified.
+
+    """
     
+    r = np.arange(-int(n/2), int(n/2)+1, dtype=np.float64)
+    return 1 / (sigma * np.sqrt(2*np.pi)) * np.exp(-r**2/(2*sigma**2))
+
+#
+# =============================================================================
+#
+
+@functools.lru_cache(maxsize=32)
+def _LoessWindow(n):
+    """
+    Create a normalized tri-cubic Loess kernel, reusing it for every later
+    Signal smoothed with the same window size.
+
+    Parameters
+    ----------
+    n : int
+        Size of the kernel.
+
+    Returns
+    -------
+    window : ndarray
+        The Loess kernel. Shared between calls, so must not be modified.
+
+    """
     
+    window = np.linspace(-1,1,n+1,endpoint=False)[1:]
+    window = (1 - np.abs(window) ** 3) ** 3
+    return window / np.sum(window)
+
+#
+# =============================================================================
+#
+
+def _GaussianSmooth(vals, window_size, sigma):
+    """
+    Apply a Gaussian smoothing filter to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    window_size : int, float
+        Size of the window of the filter.
+    sigma : float
+        Parameter of sigma in the Gaussian smoothing.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if window_size is less or equal to 0.
+    Warning
+        A warning is raised if window_size is greater than Signal length.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
     
-    Signal = Signal.copy()
-    # Square
-    Signal[col] = np.power(Signal[col], 2)
-    # Construct kernel
-    window = np.ones(window_size) / float(window_size)
-    # Convolve and square root
-    Signal[col] = np.sqrt(np.convolve(Signal[col], window, 'same'))
-    return Signal
+    if window_size > len(vals):
+        warnings.warn("Warning: Selected window size is greater than Signal file.")
+    
+    if window_size <= 0:
+        raise Exception("window_size cannot be 0 or negative")
+    
+    # Convolve the rectified values with the kernel
+    return _ConvolveSame(np.abs(vals), _GaussianWindow(window_size, sigma))
 
 #
 # =============================================================================
@@ -657,28 +1313,51 @@ def ApplyGaussianSmooth(Signal, col, window_size, sigma=1):
 
     """
     
-    # Helper function for creating a Gaussian kernel
-    def getGauss(n, sigma):
-        r = range(-int(n/2), int(n/2)+1)
-        return [1 / (sigma * np.sqrt(2*np.pi)) * np.exp(-float(x)**2/(2*sigma**2)) for x in r]
+    if col not in Signal.columns:
+        raise Exception("Column " + col + " not in Signal")
     
-    if window_size > len(Signal.index):
-        warnings.warn("Warning: Selected window size is greater than Signal file.")
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _GaussianSmooth(Signal[col].to_numpy(dtype=np.float64), window_size, sigma)
+    return Signal
+
+#
+# =============================================================================
+#
+
+def _LoessSmooth(vals, window_size):
+    """
+    Apply a Loess smoothing filter to the values of a Signal.
+
+    Parameters
+    ----------
+    vals : ndarray
+        Values of a Signal. If 2D, each column is filtered separately.
+    window_size : int, float
+        Size of the window of the filter.
+
+    Raises
+    ------
+    Exception
+        An exception is raised if window_size is less or equal to 0.
+    Warning
+        A warning is raised if window_size is greater than Signal length.
+
+    Returns
+    -------
+    ndarray
+        The filtered values.
+
+    """
     
-    if col not in list(Signal.columns.values):
-        raise Exception("Column " + col + " not in Signal")
+    if window_size > len(vals):
+        warnings.warn("Warning: Selected window size is greater than Signal file.")
     
     if window_size <= 0:
         raise Exception("window_size cannot be 0 or negative")
     
-    Signal = Signal.copy()
-    
-    Signal = ApplyFWR(Signal, col)
-    # Construct kernel
-    window = getGauss(window_size, sigma)
-    # Convolve
-    Signal[col] = np.convolve(Signal[col], window, 'same')
-    return Signal
+    # Convolve the rectified values with the kernel
+    return _ConvolveSame(np.abs(vals), _LoessWindow(window_size))
 
 #
 # =============================================================================
@@ -715,31 +1394,19 @@ def ApplyLoessSmooth(Signal, col, window_size):
 
     """
     
-    if window_size > len(Signal.index):
-        warnings.warn("Warning: Selected window size is greater than Signal file.")
-    
-    if col not in list(Signal.columns.values):
+    if col not in Signal.columns:
         raise Exception("Column " + col + " not in Signal")
     
-    if window_size <= 0:
-        raise Exception("window_size cannot be 0 or negative")
-    
-    Signal = Signal.copy()
-    
-    Signal = ApplyFWR(Signal, col)
-    # Construct kernel
-    window = np.linspace(-1,1,window_size+1,endpoint=False)[1:]
-    window = np.array(list(map(lambda x: (1 - np.abs(x) ** 3) ** 3, window)))
-    window = window / np.sum(window)
-    # Convolve
-    Signal[col] = np.convolve(Signal[col], window, 'same')
+    # Shallow copy, so only the replaced column is newly allocated
+    Signal = Signal.copy(deep=False)
+    Signal[col] = _LoessSmooth(Signal[col].to_numpy(dtype=np.float64), window_size)
     return Signal
 
 #
 # =============================================================================
 #
 
-def SmoothFilterSignals(in_path, out_path, window_size, cols=None, expression=None, exp_copy=False, file_ext='csv', method='rms', sigma=1):  
+def SmoothFilterSignals(in_path, out_path, window_size, cols=None, expression=None, exp_copy=False, file_ext='csv', method='rms', sigma=1, dtype=np.float64):
     """
     Apply smoothing filters to all Signals in a folder. Writes filtered Signals
     to an output folder, and generates a file structure matching the input
@@ -774,6 +1441,10 @@ def SmoothFilterSignals(in_path, out_path, window_size, cols=None, expression=No
     sigma: float, optional
         The value of sigma used for a Gaussian filter. Only affects output when
         using Gaussian filtering.
+    dtype : data-type, optional
+        Floating point type the filtered columns are processed and written in.
+        np.float32 halves the memory and bandwidth used while filtering, at
+        the cost of precision. The default is np.float64.
 
     Raises
     ------
@@ -801,9 +1472,11 @@ def SmoothFilterSignals(in_path, out_path, window_size, cols=None, expression=No
 
     """
     
+    # Compile the regular expression once for every file
+    pattern = None
     if expression is not None:
         try:
-            re.compile(expression)
+            pattern = re.compile(expression)
         except:
             raise Exception("Invalid regex expression provided")
     
@@ -815,49 +1488,23 @@ def SmoothFilterSignals(in_path, out_path, window_size, cols=None, expression=No
     if exp_copy:
         filedirs = MapFiles(in_path, file_ext=file_ext)
     else:
-        filedirs = MapFiles(in_path, file_ext=file_ext, expression=expression)
+        filedirs = MapFiles(in_path, file_ext=file_ext, expression=pattern)
         if len(filedirs) == 0:
             warnings.warn("Warning: The regular expression " + expression + " did not match with any files.")
     
+    # Select the smoothing filter
+    if method == 'rms':
+        Filter, args = _RMSSmooth, (window_size,)
+    elif method == 'boxcar':
+        Filter, args = _BoxcarSmooth, (window_size,)
+    elif method == 'guass':
+        Filter, args = _GaussianSmooth, (window_size, sigma)
+    elif method == 'loess':
+        Filter, args = _LoessSmooth, (window_size,)
+    else:
+        raise Exception('Invalid smoothing method used: ', method, ', use "rms", "boxcar", "gauss" or "loess"')
+    
     # Apply transformations
-    for file in tqdm(filedirs):
-        if (file[-len(file_ext):] == file_ext) and ((expression is None) or (re.match(expression, file))):
-            
-            # Read file
-            data = ReadFileType(filedirs[file], file_ext)
-            
-            # If no columns selected, apply filter to all columns except time
-            if cols is None:
-                cols = list(data.columns)
-                if 'Time' in cols:
-                    cols.remove('Time')
-              
-            # Apply filter to columns
-            for col in cols:
-                if method == 'rms':
-                    data = ApplyRMSSmooth(data, col, window_size)
-                elif method == 'boxcar':
-                    data = ApplyBoxcarSmooth(data, col, window_size)
-                elif method == 'guass':
-                    data = ApplyGaussianSmooth(data, col, window_size, sigma)
-                elif method == 'loess':
-                    data = ApplyLoessSmooth(data, col, window_size)
-                else:
-                    raise Exception('Invalid smoothing method used: ', method, ', use "rms", "boxcar", "gauss" or "loess"')
-                
-            # Construct out path
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            
-            # Make folders and write data
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
-        
-        elif (file[-len(file_ext):] == file_ext) and exp_copy:
-            # Copy the file even if it doesn't match if exp_copy is true
-            data = ReadFileType(filedirs[file], file_ext)
-            out_file = out_path + filedirs[file][len(in_path):]
-            out_folder = out_file[:len(out_file) - len(file)]
-            os.makedirs(out_folder, exist_ok=True)
-            data.to_csv(out_file, index=False)
+    _FilterFiles(in_path, out_path, filedirs, cols, pattern, exp_copy, file_ext, Filter, args, dtype)
+    
     return
@@ -1,6 +1,7 @@
 import unittest
 import pandas as pd
 import numpy as np
+import scipy.signal
 import os
 import sys
 
@@ -71,6 +72,8 @@ class TestSimple(unittest.TestCase):
     def test_CalcLOG(self):
         val = CalcLOG(test_df, 'r1')
         self.assertAlmostEqual(val, 3.0311944199668637, 6)
+        val = CalcLOG(test_df_2, 'r1')
+        self.assertAlmostEqual(val, 5040 ** (1/7), 6)
     
     def test_CalcMFL(self):
         val = CalcMFL(test_df, 'r1')
@@ -80,9 +83,42 @@ class TestSimple(unittest.TestCase):
         val = CalcAP(test_df, 'r1')
         self.assertAlmostEqual(val, 17.4, 6)
     
+    def test_CalcTimeFeatures(self):
+        vals = CalcTimeFeatures(test_df, 'r1', test_sr, threshold=5)
+        self.assertAlmostEqual(vals['IEMG'], CalcIEMG(test_df, 'r1', test_sr), 6)
+        self.assertAlmostEqual(vals['MMAV'], CalcMMAV(test_df, 'r1'), 6)
+        self.assertAlmostEqual(vals['VOrder'], CalcVOrder(test_df, 'r1'), 6)
+        self.assertAlmostEqual(vals['LOG'], CalcLOG(test_df, 'r1'), 6)
+        self.assertAlmostEqual(vals['MFL'], CalcMFL(test_df, 'r1'), 6)
+        self.assertEqual(vals['WAMP'], CalcWAMP(test_df, 'r1', 5))
+    
+    def test_CalcWindowFeatures(self):
+        vals = CalcWindowFeatures(test_df, 'r1', test_sr, 10, step=5)
+        self.assertEqual(list(vals['Start']), [0, 5, 10, 15])
+        window_df = test_df.iloc[5:15].reset_index(drop=True)
+        self.assertAlmostEqual(vals['RMS'][1], CalcRMS(window_df, 'r1'), 6)
+        self.assertAlmostEqual(vals['WL'][1], CalcWL(window_df, 'r1'), 6)
+        
+        with self.assertRaises(Exception):
+            CalcWindowFeatures(test_df, 'r1', test_sr, 30)
+    
     def test_CalcSpecFlux(self):
         val = CalcSpecFlux(test_df, 0.5, 'r1', test_sr)
         self.assertAlmostEqual(val, 0.5224252376723382, 6)
+        
+        # Split a quarter of the way in, the PSDs of both parts are sized for
+        # the shorter, 25 sample part (nperseg 12, nfft 24), so they share
+        # the 9 bins from 166.67 Hz to 500 Hz
+        df = pd.DataFrame({'r1':list(test_df['r1']) * 4})
+        val = CalcSpecFlux(df, 0.25, 'r1', test_sr)
+        self.assertAlmostEqual(val, 0.1268989550205563, 6)
+        
+        def welch(vals):
+            frequency, power = scipy.signal.welch(vals - np.mean(vals), fs=test_sr, detrend=False,
+                                                  nfft=24, nperseg=12, window='hann')
+            return (power / np.max(power))[frequency >= 160]
+        vals = df['r1'].to_numpy(dtype=np.float64)
+        self.assertAlmostEqual(val, np.sum((welch(vals[:25]) - welch(vals[25:])) ** 2), 10)
     
     def test_CalcTwitchRatio(self):
         test_psd = EMG2PSD(test_df['r1'])
@@ -119,6 +155,8 @@ class TestSimple(unittest.TestCase):
         test_psd = EMG2PSD(test_df['r1'])
         val = CalcSDec(test_psd)
         self.assertAlmostEqual(val, -0.02570405799570487, 6)
+        val = CalcSDec(test_psd, weighted=True)
+        self.assertAlmostEqual(val, 0.0014625681224386697, 6)
     
     def test_CalcSEntropy(self):
         test_psd = EMG2PSD(test_df['r1'])
@@ -128,7 +166,7 @@ class TestSimple(unittest.TestCase):
     def test_CalcSRoll(self):
         test_psd = EMG2PSD(test_df['r1'])
         val = CalcSRoll(test_psd, 0.5)
-        self.assertAlmostEqual(val, 166.66666666666666, 6)
+        self.assertAlmostEqual(val, 291.66666666666663, 6)
     
     def test_CalcSBW(self):
         test_psd = EMG2PSD(test_df['r1'])
@@ -141,6 +179,11 @@ class TestSimple(unittest.TestCase):
 
     def test_ExtractFeatures(self):
         ExtractFeatures('./Testing/', './Testing/', './Testing_out', 100)
+    
+    def test_ExtractFeatures_workers(self):
+        df_serial = ExtractFeatures('./Testing/', './Testing/', './Testing_out', 100, workers=1)
+        df_pool = ExtractFeatures('./Testing/', './Testing/', './Testing_out', 100, workers=2)
+        pd.testing.assert_frame_equal(df_serial, df_pool)
 
 #
 # =============================================================================
@@ -3,6 +3,7 @@ import pandas as pd
 import sys
 import numpy as np
 import os
+import tempfile
 
 from src.EMGFlow.FileAccess import *
 
@@ -35,14 +36,65 @@ class TestSimple(unittest.TestCase):
     def test_ReadFileType(self):
         df = ReadFileType('./Testing/Data.csv', 'csv')
         self.assertIsInstance(df, pd.DataFrame)
+        df_pd = ReadFileType('./Testing/Data.csv', 'csv', use_fast_io=False)
+        self.assertEqual(list(df.columns), list(df_pd.columns))
+        self.assertTrue(np.allclose(df.to_numpy(), df_pd.to_numpy()))
+        df_col = ReadFileType('./Testing/Data.csv', 'csv', cols=['EMG'])
+        self.assertEqual(list(df_col.columns), ['EMG'])
+        for use_fast_io in [True, False]:
+            df_32 = ReadFileType('./Testing/Data.csv', 'csv', use_fast_io=use_fast_io, dtype=np.float32)
+            self.assertEqual(df_32['Time'].dtype, np.float64)
+            self.assertEqual(df_32['EMG'].dtype, np.float32)
+            df_32 = ReadFileType('./Testing/Data.csv', 'csv', use_fast_io=use_fast_io, cols=['EMG'], dtype=np.float32)
+            self.assertEqual(df_32['EMG'].dtype, np.float32)
+        
+        # Non-numeric columns are left alone
+        df_label = ReadFileType('./Testing/Data.csv', 'csv')
+        df_label['Label'] = 'rest'
+        df_label.to_csv('./Testing_out/Label.csv', index=False)
+        for use_fast_io in [True, False]:
+            df_32 = ReadFileType('./Testing_out/Label.csv', 'csv', use_fast_io=use_fast_io, dtype=np.float32)
+            self.assertEqual(df_32['EMG'].dtype, np.float32)
+            self.assertEqual(list(df_32['Label'].unique()), ['rest'])
+        os.remove('./Testing_out/Label.csv')
+    
+    def test_WriteFileType(self):
+        df = ReadFileType('./Testing/Data.csv', 'csv')
+        WriteFileType(df, './Testing_out/Data.csv', 'csv')
+        df_out = ReadFileType('./Testing_out/Data.csv', 'csv')
+        os.remove('./Testing_out/Data.csv')
+        self.assertTrue(df.equals(df_out))
+        
+        with self.assertRaises(Exception):
+            WriteFileType(df, './Testing_out/Data.txt', 'txt')
+    
+    def test_ReadFileColumns(self):
+        cols = ReadFileColumns('./Testing/Data.csv', 'csv')
+        self.assertEqual(cols, ['Time', 'EMG'])
+        
+        with self.assertRaises(Exception):
+            ReadFileColumns('./Testing/Data.csv', 'txt')
     
     def test_MapFiles(self):
         dic = MapFiles('./Testing')
         self.assertEqual(list(dic.keys()), ['Data.csv'])
+        
+        # Files are listed depth first in name order, whatever order the
+        # file system returns them in
+        with tempfile.TemporaryDirectory() as folder:
+            os.mkdir(os.path.join(folder, 'a'))
+            for name in ['c.csv', 'a/d.csv', 'b.csv', 'a/a.csv']:
+                open(os.path.join(folder, name), 'w').close()
+            dic = MapFiles(folder)
+            self.assertEqual(list(dic.keys()), ['a.csv', 'd.csv', 'b.csv', 'c.csv'])
+            self.assertEqual(dic['d.csv'], os.path.join(folder, 'a', 'd.csv'))
     
     def test_ConvertMapFiles(self):
         dic = ConvertMapFiles('./Testing')
         self.assertEqual(list(dic.keys()), ['Data.csv'])
+        f1 = {'f1.csv': 'data/raw/f1.csv', 'f2.csv': 'data/raw/f2.csv', 'g1.csv': 'data/raw/g1.csv'}
+        dic = ConvertMapFiles(f1, expression='^f')
+        self.assertEqual(list(dic.keys()), ['f1.csv', 'f2.csv'])
     
     def test_MapFilesFuse(self):
         f1 = {'f1': 'data/raw/file1.csv', 'f2': 'data/raw/file2.csv'}
@@ -53,6 +105,9 @@ class TestSimple(unittest.TestCase):
                             'raw':['data/raw/file1.csv', 'data/raw/file2.csv'],
                             'notch': ['data/notch/file1.csv', 'data/notch/file2.csv']}).set_index('ID')
         self.assertTrue(ans.equals(mf))
+        
+        with self.assertRaises(Exception):
+            MapFilesFuse([f1, {'f1': 'data/notch/file1.csv'}], ['raw', 'notch'])
 
 #
 # =============================================================================
@@ -3,11 +3,13 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import tempfile
 
 #from EMGFlow.OutlierFinder import *
 #from EMGFlow.PreprocessSignals import EMG2PSD
 
 from src.EMGFlow.OutlierFinder import *
+from src.EMGFlow.OutlierFinder import _FitRational, _Rational, _ReadColumns
 
 class TestSimple(unittest.TestCase):
     
@@ -39,6 +41,38 @@ class TestSimple(unittest.TestCase):
             
         outliers = DetectOutliers('./Testing', 100, 5, window_size=5)
         self.assertIsInstance(outliers, dict)
+    
+    def test_DetectOutliers_spike(self):
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            rng = np.random.default_rng(0)
+            time_col = np.array(range(5000)) / 1000
+            clean = rng.standard_normal(5000)
+            spike = rng.standard_normal(5000) + 5*np.sin(2*np.pi*60*time_col)
+            pd.DataFrame({'Time':time_col, 'EMG':clean}).to_csv(os.path.join(tmp, 'Clean.csv'), index=False)
+            pd.DataFrame({'Time':time_col, 'EMG':spike}).to_csv(os.path.join(tmp, 'Spike.csv'), index=False)
+            
+            # Only the file with a narrow-band spike is flagged
+            for window_size in [5, 10, 20, 50]:
+                outliers = DetectOutliers(tmp, 1000, 10, window_size=window_size)
+                self.assertEqual(sorted(outliers), ['Spike.csv'])
+    
+    def test_ReadColumns(self):
+        
+        # Reading in chunks gives the same samples as reading the whole file
+        df = pd.read_csv('./Testing/Data.csv')
+        data = _ReadColumns('./Testing/Data.csv', 'csv', ['EMG', 'Time'], chunksize=64)
+        self.assertEqual(data.dtype, np.float32)
+        self.assertTrue(np.array_equal(data, df[['EMG', 'Time']].to_numpy(dtype=np.float32)))
+    
+    def test_FitRational(self):
+        
+        # Recover c/(a*x+1) from exact points
+        x = np.linspace(1, 500, 50)
+        a, c = 0.02, 3.0
+        params = _FitRational(x, c / (a*x + 1))
+        self.assertTrue(np.allclose(params, [c, a, 1]))
+        self.assertTrue(np.allclose(_Rational(x, params), c / (a*x + 1)))
 
     def tearDown(self):
         if os.path.exists('./Testing') == True:
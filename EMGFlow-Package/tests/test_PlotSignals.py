@@ -4,10 +4,13 @@ import numpy as np
 import shiny
 import sys
 import os
+import tempfile
 
 #from EMGFlow.PlotSignals import *
 
 from src.EMGFlow.PlotSignals import *
+from src.EMGFlow.PlotSignals import _LoadPSD
+from src.EMGFlow.PreprocessSignals import _EMG2PSDArrays
 
 in_path = ''
 out_path = ''
@@ -29,10 +32,72 @@ class TestSimple(unittest.TestCase):
     
     def test_PlotSpectrum(self):
         PlotSpectrum('./Testing', './Testing_plots', 100, cols=['EMG'])
+        PlotSpectrum('./Testing', './Testing_plots', 100, cols=['EMG'], workers=None)
     
     def test_PlotCompareSignals(self):
         PlotCompareSignals('./Testing', './Testing', './Testing_plots', 100)
     
+    def test_LoadPSD_cache(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'Cache.csv')
+            cache_dir = os.path.join(folder, 'psd_cache')
+            os.mkdir(cache_dir)
+            
+            # Column names that match the cache's own keys must not clash
+            df = pd.DataFrame({'Time': np.arange(500) / 100,
+                               'EMG': np.random.rand(500),
+                               'mtime': np.random.rand(500),
+                               'sampling_rate': np.random.rand(500),
+                               'Frequency': np.random.rand(500)})
+            df.to_csv(path, index=False)
+            
+            def expected(col):
+                return _EMG2PSDArrays(df[[col]].to_numpy(dtype=np.float64), sampling_rate=100)
+            
+            frequency, psd = _LoadPSD('Cache.csv', path, ['EMG'], 100, 'csv', cache_dir=cache_dir)
+            self.assertEqual(psd['EMG'].dtype, np.float64)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cache_file = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            self.assertTrue(np.allclose(frequency, expected('EMG')[0]))
+            self.assertTrue(np.allclose(psd['EMG'], expected('EMG')[1][:, 0]))
+            
+            # Missing columns are calculated and added to the cache
+            frequency, psd = _LoadPSD('Cache.csv', path, ['EMG', 'mtime', 'sampling_rate', 'Frequency'], 100, 'csv', cache_dir=cache_dir)
+            for col in ['mtime', 'sampling_rate', 'Frequency']:
+                self.assertTrue(np.allclose(psd[col], expected(col)[1][:, 0]))
+            self.assertTrue(np.allclose(frequency, expected('EMG')[0]))
+            with np.load(cache_file) as cached:
+                self.assertEqual(sorted(cached['columns']), ['EMG', 'Frequency', 'mtime', 'sampling_rate'])
+            
+            # The cache is used while the file keeps its modification time
+            mtime = os.path.getmtime(path)
+            old_power = psd['EMG']
+            df['EMG'] = np.random.rand(500)
+            df.to_csv(path, index=False)
+            os.utime(path, (mtime, mtime))
+            frequency, psd = _LoadPSD('Cache.csv', path, ['EMG'], 100, 'csv', cache_dir=cache_dir)
+            self.assertTrue(np.array_equal(psd['EMG'], old_power))
+            
+            # And recalculated once the file is modified
+            os.utime(path, (mtime + 10, mtime + 10))
+            frequency, psd = _LoadPSD('Cache.csv', path, ['EMG'], 100, 'csv', cache_dir=cache_dir)
+            self.assertTrue(np.allclose(psd['EMG'], expected('EMG')[1][:, 0]))
+            self.assertFalse(np.allclose(psd['EMG'], old_power))
+    
+    def test_PlotSpectrum_cache(self):
+        with tempfile.TemporaryDirectory() as folder:
+            in_path = os.path.join(folder, 'in')
+            out_path = os.path.join(folder, 'out')
+            os.mkdir(in_path)
+            pd.read_csv('./Testing/Data.csv').to_csv(os.path.join(in_path, 'Data.csv'), index=False)
+            
+            # Cached PSDs go to the output folder, not next to the Signals
+            PlotSpectrum(in_path, out_path, 100, cols=['EMG'], cache_psd=True)
+            PlotCompareSignals(in_path, in_path, out_path, 100, cache_psd=True)
+            self.assertEqual(os.listdir(in_path), ['Data.csv'])
+            self.assertEqual(list(MapFiles(in_path, 'csv')), ['Data.csv'])
+            self.assertEqual(len(os.listdir(os.path.join(out_path, 'psd_cache'))), 1)
+    
     def test_GenPlotDash(self):
         app = GenPlotDash(['./Testing'], 'EMG', 'mV', ['Test'], autorun=False)
         self.assertIsInstance(app, shiny.App)
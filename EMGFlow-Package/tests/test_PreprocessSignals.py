@@ -1,6 +1,7 @@
 import unittest
 import pandas as pd
 import numpy as np
+import scipy
 import os
 import sys
 
@@ -37,9 +38,16 @@ class TestSimple(unittest.TestCase):
 
     def test_BandpassFilterSignals(self):
         BandpassFilterSignals('./Testing/', './Testing_out/', 100, 10, 40, cols=['EMG'])
+        BandpassFilterSignals('./Testing/', './Testing_out/', 100, 10, 40, cols=['EMG'], chunksize=100)
+        
+        with self.assertRaises(Exception):
+            BandpassFilterSignals('./Testing/', './Testing_out/', 100, 10, 40, cols=['EMG'], file_ext='parquet', chunksize=100)
+        with self.assertRaises(Exception):
+            NotchFilterSignals('./Testing/', './Testing_out/', 100, [(10,4)], cols=['EMG'], file_ext='parquet', chunksize=100)
         
     def test_SmoothFilterSignals(self):
         SmoothFilterSignals('./Testing/', './Testing_out/', 5, ['EMG'])
+        SmoothFilterSignals('./Testing/', './Testing_out/', 5, ['EMG'], dtype=np.float32)
     
 
 #
@@ -57,6 +65,16 @@ class TestSimple(unittest.TestCase):
                           '':[4,5,6,7,8,9,10,11,12]}).set_index('')
         self.assertTrue(ans.equals(test))
     
+    def test_EMG2PSD_multi(self):
+        test_multi = pd.DataFrame({'r1':test_df['r1'], 'r2':test_df['r1'][::-1].values})
+        test = EMG2PSD(test_multi)
+        self.assertEqual(list(test.columns), ['Frequency', 'r1', 'r2'])
+        ans = EMG2PSD(test_multi['r2'])
+        self.assertTrue(np.allclose(test['r2'], ans['Power']))
+        test = EMG2PSD(test_multi.to_numpy())
+        self.assertEqual(list(test.columns), ['Frequency', 0, 1])
+        self.assertTrue(np.allclose(test[1], ans['Power']))
+    
     def test_ApplyNotchFilters(self):
         test = ApplyNotchFilters(test_df, 'r1', test_sr, [(300, 1)])
         test = list(test['r1'].round(6))
@@ -65,6 +83,11 @@ class TestSimple(unittest.TestCase):
                4.123417,3.045906,4.849224,3.046484,3.701607,1.723204,3.764653,
                2.537514,5.766236,2.145930,3.981718]
         self.assertEqual(test, ans)
+        
+        test = ApplyNotchFilters(test_df, 'r1', test_sr, [(300, 1)], zero_phase=True)
+        b, a = scipy.signal.iirnotch(300 / (test_sr/2), 1)
+        ans = scipy.signal.filtfilt(b, a, test_df['r1'])
+        self.assertTrue(np.allclose(test['r1'], ans))
     
     def test_ApplyBandpassFilter(self):
         test = ApplyBandpassFilter(test_df, 'r1', test_sr, 200, 400)